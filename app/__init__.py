@@ -1,3 +1,4 @@
+import redis
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
@@ -12,7 +13,12 @@ from celery import Celery
 from app.config import Config
 from app.extensions import db, migrate, socketio, login_manager, jwt, api, csrf, limiter, celery
 from app.mcp import MCP
+from app.boundaries import BoundaryRegistry
+from app.ingest import ingest_command
+from app.metrics import metrics_view
 from app.blueprints.dashboard import dashboard_bp
+from app.blueprints.dashboard.sockets import broadcaster as dashboard_broadcaster
+from app.utils import init_app as init_engines
 from app.blueprints.radar import radar_bp
 from app.blueprints.auth import auth_bp
 from app.blueprints.api import api_bp
@@ -24,13 +30,15 @@ def create_app(config_class=Config):
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
-    socketio.init_app(app)
+    # Redis message queue lets Celery workers emit to connected clients
+    socketio.init_app(app, message_queue=app.config['SOCKETIO_MESSAGE_QUEUE'])
     login_manager.init_app(app)
     jwt.init_app(app)
     api.init_app(app)
     csrf.init_app(app)
     limiter.init_app(app)
     app.celery = make_celery(app)
+    app.redis = redis.from_url(app.config['REDIS_URL'])
 
     # Register blueprints
     app.register_blueprint(dashboard_bp)
@@ -38,8 +46,32 @@ def create_app(config_class=Config):
     app.register_blueprint(auth_bp)
     app.register_blueprint(api_bp, url_prefix='/api')
 
+    # Prometheus scrape endpoint for per-stage latency histograms
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+    # CLI: flask ingest <source> [--format csv] [--replay SPEED]
+    app.cli.add_command(ingest_command)
+
     # MCP initialization
-    app.mcp = MCP(app.config['ANTHROPIC_API_KEY'])
+    app.mcp = MCP(
+        app.config['ANTHROPIC_API_KEY'],
+        max_context_tokens=app.config['MCP_MAX_CONTEXT_TOKENS'],
+        max_sessions=app.config['MCP_MAX_SESSIONS'],
+        idle_seconds=app.config['MCP_SESSION_IDLE_SECONDS'],
+        summarize=app.config['MCP_SUMMARIZE'],
+        response_cache_ttl=app.config['MCP_RESPONSE_CACHE_TTL'],
+        max_workers=app.config['MCP_MAX_WORKERS'],
+    )
+
+    # Maritime boundaries are built and prepared once per process
+    app.boundaries = BoundaryRegistry.from_file(app.config['MARITIME_BOUNDARIES_FILE'])
+    dashboard_broadcaster.init_app(app)
+    init_engines(app)
+
+    # Warm workers build their models before gunicorn/Celery fork children
+    if app.config['MODEL_PRELOAD']:
+        from app.utils import models
+        models.preload(app.config['MODEL_PRELOAD'])
 
     return app
 
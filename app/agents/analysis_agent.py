@@ -1,11 +1,12 @@
 from app.mcp import MCP
 from app.utils import query_rag
-from langgraph import Agent
+from app.metrics import instrument
 
-class AnalysisAgent(Agent):
+class AnalysisAgent:
     def __init__(self, mcp):
         self.mcp = mcp
 
+    @instrument('agent_analysis')
     def run(self, input_data):
         # RAG query
         query = input_data.get('query', "Historical incidents for this vessel")
@@ -13,6 +14,7 @@ class AnalysisAgent(Agent):
 
         # LLM analysis
         prompt = f"Analyze anomalies with context: {input_data['anomalies'].to_json()} and RAG: {rag_response}"
-        response = self.mcp.send_message_with_context('analysis', prompt, model="claude-3-opus-20240229")
+        response = self.mcp.send_message_with_context(
+            MCP.session_key('analysis', input_data.get('incident_id')), prompt, model="claude-3-opus-20240229")
 
-        return {"analysis": response}
\ No newline at end of file
+        return {"incident_id": input_data.get('incident_id'), "analysis": response}
\ No newline at end of file
@@ -1,23 +1,38 @@
 from app.mcp import MCP
-from app.utils import perform_ocr, detect_anomalies
-from langgraph import Agent
+from app.utils import perform_ocr_batch, detect_anomalies
+from app.metrics import instrument
 
-class DetectionAgent(Agent):
+class DetectionAgent:
     def __init__(self, mcp):
         self.mcp = mcp
 
+    @instrument('agent_detection')
     def run(self, input_data):
-        # Example: OCR on image, then anomaly detection
-        if 'image_path' in input_data:
-            text = perform_ocr(input_data['image_path'])
-            input_data['ocr_text'] = text
+        incident_id = input_data.get('incident_id')
+        result = {"incident_id": incident_id}
+
+        # Example: OCR on images, then anomaly detection
+        images = input_data.get('image_paths') or ([input_data['image_path']] if 'image_path' in input_data else [])
+        if images:
+            texts = perform_ocr_batch(images)
+            result['ocr_texts'] = texts
+            result['ocr_text'] = ' '.join(texts)
 
         # Anomaly detection on vessel data
         df = input_data['vessel_df']
         anomalies = detect_anomalies(df)
 
-        # LLM for threat detection
-        prompt = f"Analyze this data for threats: {anomalies.to_json()}"
-        response = self.mcp.send_message_with_context('detection', prompt)
+        # LLM for threat detection; imagery is read in its own session at the same time
+        requests = [(MCP.session_key('detection', incident_id),
+                     f"Analyze this data for threats: {anomalies.to_json()}", {})]
+        if images:
+            requests.append((MCP.session_key('imagery', incident_id),
+                             f"Summarize vessel identifiers and threats in this imagery text: {result['ocr_text']}", {}))
+        responses = self.mcp.send_many(requests)
 
-        return {"anomalies": anomalies, "threat_analysis": response}
\ No newline at end of file
+        # Downstream agents only see the graph state, so the vessels travel with it
+        result.update(anomalies=anomalies, threat_analysis=responses[0],
+                      vessel_ids=sorted(map(str, anomalies['vessel_id'])) if 'vessel_id' in anomalies else [])
+        if images:
+            result['imagery_analysis'] = responses[1]
+        return result
@@ -1,10 +1,33 @@
-from langgraph import Graph
+import threading
+import uuid
+from typing import Any, TypedDict
+from langgraph.graph import StateGraph, START, END
 from app.agents.detection_agent import DetectionAgent
 from app.agents.analysis_agent import AnalysisAgent
 from app.agents.response_agent import ResponseAgent
 
-def orchestrate_workflow(mcp, input_data):
-    graph = Graph()
+_workflows = {}
+_lock = threading.Lock()
+
+
+class WorkflowState(TypedDict, total=False):
+    # Nodes return partial updates; the graph merges them so later agents still see earlier keys
+    incident_id: str
+    vessel_df: Any
+    image_path: str
+    image_paths: list
+    query: str
+    ocr_texts: list
+    ocr_text: str
+    anomalies: Any
+    vessel_ids: list
+    threat_analysis: Any
+    imagery_analysis: Any
+    analysis: Any
+    response_plan: Any
+
+def build_workflow(mcp):
+    graph = StateGraph(WorkflowState)
 
     detection = DetectionAgent(mcp)
     analysis = AnalysisAgent(mcp)
@@ -14,11 +37,23 @@ def orchestrate_workflow(mcp, input_data):
     graph.add_node("analysis", analysis.run)
     graph.add_node("response", response.run)
 
+    graph.add_edge(START, "detection")
     graph.add_edge("detection", "analysis")
     graph.add_edge("analysis", "response")
+    graph.add_edge("response", END)
+
+    return graph.compile()
 
-    graph.set_entry_point("detection")
-    graph.set_finish_point("response")
+def get_workflow(mcp):
+    # The graph and its agents are built once per MCP client, not per request
+    workflow = _workflows.get(id(mcp))
+    if workflow is None:
+        with _lock:
+            workflow = _workflows.setdefault(id(mcp), build_workflow(mcp))
+    return workflow
 
-    result = graph.invoke(input_data)
-    return result
\ No newline at end of file
+def orchestrate_workflow(mcp, input_data):
+    # Each workflow run gets its own conversation per agent
+    input_data = dict(input_data, incident_id=input_data.get('incident_id') or uuid.uuid4().hex)
+    result = get_workflow(mcp).invoke(input_data)
+    return result
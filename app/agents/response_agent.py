@@ -1,16 +1,34 @@
+import hashlib
 from app.mcp import MCP
-from langgraph import Agent
+from app.metrics import instrument
 
-class ResponseAgent(Agent):
+class ResponseAgent:
     def __init__(self, mcp):
         self.mcp = mcp
 
+    @instrument('agent_response')
     def run(self, input_data):
         prompt = f"Generate response plan for analysis: {input_data['analysis']}"
-        response = self.mcp.send_message_with_context('response', prompt)
+        response = self.mcp.send_message_with_context(
+            MCP.session_key('response', input_data.get('incident_id')), prompt)
 
-        # Example action: Send alert via SocketIO
+        # Example action: Send alert via SocketIO, once per set of vessels within the cooldown
         from app.extensions import socketio
-        socketio.emit('new_alert', {'message': response})
+        from app.utils import alert_engine
+        vessel_ids = sorted(map(str, input_data.get('vessel_ids') or []))
+        if not vessel_ids:
+            subject = f"incident:{input_data.get('incident_id')}"
+        elif len(vessel_ids) == 1:
+            subject = vessel_ids[0]
+        else:
+            subject = 'group:' + hashlib.sha1(','.join(vessel_ids).encode()).hexdigest()[:16]
+        event = alert_engine.notify({
+            'vessel_id': subject,
+            'type': 'response_plan',
+            'message': self.mcp.text(response),
+        })
+        if event is not None:
+            alert_engine.flush()
+            socketio.emit('new_alert', {'message': event['message']})
 
-        return {"response_plan": response}
\ No newline at end of file
+        return {"incident_id": input_data.get('incident_id'), "vessel_ids": vessel_ids, "response_plan": response}
\ No newline at end of file
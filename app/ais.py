@@ -0,0 +1,151 @@
+import csv
+import time
+from datetime import datetime, timezone
+from functools import reduce
+
+POSITION_TYPES = {1, 2, 3, 18}
+
+
+def _payload_bits(payload):
+    value = 0
+    for char in payload:
+        code = ord(char) - 48
+        if code > 40:
+            code -= 8
+        value = (value << 6) | code
+    return value, len(payload) * 6
+
+
+def _field(bits, length, start, end, signed=False):
+    value = (bits >> (length - end)) & ((1 << (end - start)) - 1)
+    if signed and value & (1 << (end - start - 1)):
+        value -= 1 << (end - start)
+    return value
+
+
+def _checksum_ok(body, checksum):
+    try:
+        return reduce(lambda acc, char: acc ^ ord(char), body, 0) == int(checksum[:2], 16)
+    except ValueError:
+        return False
+
+
+def decode_nmea(line, received_at=None):
+    """Decode one !AIVDM/!AIVDO position report into a vessel record, or None.
+
+    Supports message types 1-3 (class A) and 18 (class B). A leading NMEA 4.0 tag
+    block with a ``c:`` unix timestamp is used as the report time, which is what
+    makes recorded feeds replayable.
+    """
+    line = line.strip()
+    timestamp = received_at
+    if line.startswith('\\'):
+        tag, _, line = line[1:].partition('\\')
+        for item in tag.split('*')[0].split(','):
+            if item.startswith('c:'):
+                try:
+                    timestamp = float(item[2:])
+                except ValueError:  # Malformed tag: fall back to the receive time
+                    continue
+                if timestamp > 1e11:  # milliseconds
+                    timestamp /= 1000
+    if not line.startswith(('!AIVDM', '!AIVDO')) or '*' not in line:
+        return None
+    body, checksum = line[1:].rsplit('*', 1)
+    if not _checksum_ok(body, checksum):
+        return None
+    parts = body.split(',')
+    if len(parts) < 7 or parts[1] != '1':  # position reports are single-fragment
+        return None
+    bits, length = _payload_bits(parts[5])
+    if length < 137:
+        return None
+    msg_type = _field(bits, length, 0, 6)
+    if msg_type not in POSITION_TYPES:
+        return None
+    offset = 0 if msg_type != 18 else -4  # class B fields sit 4 bits earlier
+    mmsi = _field(bits, length, 8, 38)
+    sog = _field(bits, length, 50 + offset, 60 + offset)
+    lon = _field(bits, length, 61 + offset, 89 + offset, signed=True) / 600000
+    lat = _field(bits, length, 89 + offset, 116 + offset, signed=True) / 600000
+    cog = _field(bits, length, 116 + offset, 128 + offset)
+    true_heading = _field(bits, length, 128 + offset, 137 + offset)
+    if abs(lat) > 90 or abs(lon) > 180:
+        return None
+    heading = true_heading if true_heading != 511 else (cog / 10 if cog != 3600 else None)
+    return {
+        'vessel_id': str(mmsi),
+        'lat': lat,
+        'lon': lon,
+        'speed': sog / 10 if sog != 1023 else None,
+        'heading': float(heading) if heading is not None else None,
+        'timestamp': timestamp if timestamp is not None else time.time(),
+    }
+
+
+def decode_nmea_batch(lines, received_at=None):
+    received_at = received_at if received_at is not None else time.time()
+    return [record for record in (decode_nmea(line, received_at) for line in lines) if record]
+
+
+CSV_ALIASES = {
+    'vessel_id': ('vessel_id', 'mmsi', 'MMSI'),
+    'lat': ('lat', 'latitude', 'LAT'),
+    'lon': ('lon', 'longitude', 'LON'),
+    'speed': ('speed', 'sog', 'SOG'),
+    'heading': ('heading', 'cog', 'COG'),
+    'timestamp': ('timestamp', 'time', 'BaseDateTime'),
+    'is_friendly': ('is_friendly',),
+}
+
+
+def _csv_value(row, key):
+    for alias in CSV_ALIASES[key]:
+        if row.get(alias) not in (None, ''):
+            return row[alias]
+    return None
+
+
+def _parse_time(value, default):
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return default
+    if parsed.tzinfo is None:  # AIS feeds (e.g. BaseDateTime) report UTC
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def decode_csv_batch(lines, fieldnames, received_at=None):
+    received_at = received_at if received_at is not None else time.time()
+    records = []
+    for row in csv.DictReader(lines, fieldnames=fieldnames):
+        vessel_id = _csv_value(row, 'vessel_id')
+        if vessel_id is None:
+            continue
+        # One bad value skips its row, not the rest of the feed
+        try:
+            record = {
+                'vessel_id': str(vessel_id),
+                'lat': float(_csv_value(row, 'lat')),
+                'lon': float(_csv_value(row, 'lon')),
+            }
+            for key in ('speed', 'heading', 'is_friendly'):
+                value = _csv_value(row, key)
+                record[key] = float(value) if value is not None else None
+            if record['is_friendly'] is not None:
+                record['is_friendly'] = int(record['is_friendly'])
+        except (TypeError, ValueError, OverflowError):
+            continue
+        if not (abs(record['lat']) <= 90 and abs(record['lon']) <= 180):
+            continue
+        value = _csv_value(row, 'timestamp')
+        record['timestamp'] = _parse_time(value, received_at)
+        records.append(record)
+    return records
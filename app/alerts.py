@@ -0,0 +1,154 @@
+import logging
+import math
+import threading
+import time
+import redis
+from app.extensions import db
+from app.models import Alert
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_KEY = 'alerts:notify:'
+
+
+def alert_key(alert):
+    other = alert.get('other_vessel_id')
+    if other is not None:
+        # Pair alerts are the same condition whichever vessel is listed first
+        first, other = sorted((str(alert['vessel_id']), str(other)))
+        return first, alert['type'], other
+    return alert['vessel_id'], alert['type'], alert.get('boundary')
+
+
+class AlertEngine:
+    """Turns a stream of raw alert conditions into state changes.
+
+    Each (vessel, type, subject) key is either active or not. A condition seen
+    again while active is silent; it is cleared only after staying absent for
+    ``clear_after_seconds`` (hysteresis), and a key cleared within
+    ``cooldown_seconds`` is re-armed without a second notification. Only raised and
+    cleared events are returned to the caller and persisted in batches.
+
+    One-off ``notify`` alerts come from every worker process, so their cooldown is
+    kept in Redis when ``redis_client()`` returns a client, and in memory otherwise.
+    """
+
+    def __init__(self, cooldown_seconds=300, clear_after_seconds=60, flush_size=500, flush_seconds=5.0,
+                 redis_client=None):
+        self.redis_client = redis_client or (lambda: None)
+        self.cooldown_seconds = cooldown_seconds
+        self.clear_after_seconds = clear_after_seconds
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+        self._active = {}  # key -> {'alert', 'involved', 'missing_since'}
+        self._cleared = {}  # key -> time cleared
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.cooldown_seconds = app.config['ALERT_COOLDOWN_SECONDS']
+        self.clear_after_seconds = app.config['ALERT_CLEAR_AFTER_SECONDS']
+        self.flush_size = app.config['ALERT_FLUSH_SIZE']
+        self.flush_seconds = app.config['ALERT_FLUSH_SECONDS']
+
+    def evaluate(self, alerts, scope=None, now=None):
+        """Feed the conditions found in one pass; returns the raised/cleared events.
+
+        ``scope`` is the set of vessel ids that pass looked at. Active alerts that
+        involve none of them are not marked missing, so partial passes do not clear
+        them; alerts already missing keep counting down on every call.
+        """
+        now = now or time.time()
+        scope = set(scope) if scope is not None else None
+        events = []
+        with self._lock:
+            seen = set()
+            for alert in alerts:
+                key = alert_key(alert)
+                seen.add(key)
+                state = self._active.get(key)
+                if state is not None:
+                    state['missing_since'] = None
+                    state['alert'] = alert
+                    continue
+                involved = {alert['vessel_id'], alert.get('other_vessel_id')} - {None}
+                self._active[key] = {'alert': alert, 'involved': involved, 'missing_since': None}
+                cleared_at = self._cleared.pop(key, None)
+                if cleared_at is None or now - cleared_at >= self.cooldown_seconds:
+                    events.append(dict(alert, state='raised', timestamp=now))
+
+            for key, state in list(self._active.items()):
+                if key in seen:
+                    continue
+                if state['missing_since'] is None:
+                    if scope is not None and not state['involved'] & scope:
+                        continue
+                    state['missing_since'] = now
+                # Once missing, a key clears on time even if its vessels stop changing
+                if now - state['missing_since'] >= self.clear_after_seconds:
+                    del self._active[key]
+                    self._cleared[key] = now
+                    events.append(dict(state['alert'], state='cleared', timestamp=now))
+
+            self._prune_cleared(now)
+            self._pending.extend(events)
+        return events
+
+    def notify(self, alert, now=None):
+        """Raise a one-off alert, deduplicated by key within the cooldown window."""
+        now = now or time.time()
+        key = alert_key(alert)
+        claimed = self._claim_shared(key)
+        if claimed is False:
+            return None
+        with self._lock:
+            # Workers only ever notify, so expired one-off keys are dropped here too
+            self._prune_cleared(now)
+            last = self._cleared.get(key)
+            if claimed is None and last is not None and now - last < self.cooldown_seconds:
+                return None
+            self._cleared[key] = now
+            event = dict(alert, state='raised', timestamp=now)
+            self._pending.append(event)
+        return event
+
+    def _claim_shared(self, key):
+        """SET NX the key's cooldown in Redis: True if claimed, False if taken, None without Redis."""
+        client = self.redis_client()
+        if client is None:
+            return None
+        try:
+            return bool(client.set(NOTIFY_KEY + ':'.join(map(str, key)), 1, nx=True,
+                                   ex=max(1, math.ceil(self.cooldown_seconds))))
+        except redis.RedisError:
+            logger.warning("Could not reach Redis for alert dedup; using this process's state", exc_info=True)
+            return None
+
+    def _prune_cleared(self, now):
+        expired = [key for key, at in self._cleared.items() if now - at >= self.cooldown_seconds]
+        for key in expired:
+            del self._cleared[key]
+
+    def maybe_flush(self):
+        if len(self._pending) >= self.flush_size or time.monotonic() - self._last_flush >= self.flush_seconds:
+            return self.flush()
+        return 0
+
+    def flush(self):
+        """Insert buffered events into ``Alert``; needs an app context."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+        rows = [{
+            'vessel_id': event['vessel_id'],
+            'type': event['type'],
+            'state': event['state'],
+            'message': event['message'],
+            'timestamp': event['timestamp'],
+        } for event in pending]
+        db.session.execute(db.insert(Alert), rows)
+        db.session.commit()
+        return len(rows)
@@ -0,0 +1,141 @@
+import glob
+import os
+import threading
+import time
+import joblib
+import numpy as np
+from sklearn.ensemble import IsolationForest
+
+FEATURES = ['speed', 'heading']
+
+
+class AnomalyModelManager:
+    """Serves a persisted IsolationForest and tracks feature drift.
+
+    Models are trained offline (see ``app.tasks.train_anomaly_model``) and stored as
+    versioned artifacts in ``model_dir``; a ``LATEST`` pointer file names the current one.
+    Scoring reuses the loaded forest and only reloads when the pointer changes.
+    """
+
+    def __init__(self, model_dir=None, drift_threshold=3.0, drift_alpha=0.05, keep_versions=5,
+                 bootstrap_retry_seconds=600, min_fit_rows=50):
+        self.model_dir = model_dir
+        self.min_fit_rows = min_fit_rows
+        self.drift_threshold = drift_threshold
+        self.drift_alpha = drift_alpha
+        self.keep_versions = keep_versions
+        self.bootstrap_retry_seconds = bootstrap_retry_seconds
+        self._bootstrap_requested_at = None
+        self._lock = threading.Lock()
+        self._artifact = None
+        self._loaded_mtime = None
+        self._ewma = None
+        self.drifted = False
+        self._retrain_requested = False
+
+    def init_app(self, app):
+        with self._lock:
+            self.model_dir = app.config['ANOMALY_MODEL_DIR']
+            self.bootstrap_retry_seconds = app.config['ANOMALY_TRAIN_RETRY_SECONDS']
+            self.min_fit_rows = app.config['ANOMALY_MIN_FIT_ROWS']
+            # Whatever was loaded or tracked belonged to the previous model directory
+            self._artifact = None
+            self._loaded_mtime = None
+            self._ewma = None
+            self.drifted = False
+            self._retrain_requested = False
+            self._bootstrap_requested_at = None
+
+    @property
+    def _latest_path(self):
+        return os.path.join(self.model_dir, 'LATEST')
+
+    def train(self, df, contamination=0.1):
+        features = df[FEATURES].fillna(0).to_numpy(dtype=float)
+        model = IsolationForest(contamination=contamination, random_state=42).fit(features)
+        version = time.strftime('%Y%m%d%H%M%S')
+        artifact = {
+            'version': version,
+            'model': model,
+            'mean': features.mean(axis=0),
+            'std': features.std(axis=0) + 1e-9,
+            'n_samples': len(features),
+        }
+        os.makedirs(self.model_dir, exist_ok=True)
+        filename = f'iforest-{version}.joblib'
+        joblib.dump(artifact, os.path.join(self.model_dir, filename))
+        tmp_path = self._latest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(filename)
+        os.replace(tmp_path, self._latest_path)
+        self._prune()
+        return version
+
+    def _prune(self):
+        artifacts = sorted(glob.glob(os.path.join(self.model_dir, 'iforest-*.joblib')))
+        for path in artifacts[:-self.keep_versions]:
+            os.remove(path)
+
+    def _current(self):
+        try:
+            mtime = os.stat(self._latest_path).st_mtime
+        except FileNotFoundError:
+            return None
+        if mtime != self._loaded_mtime:
+            with self._lock:
+                if mtime != self._loaded_mtime:
+                    with open(self._latest_path) as f:
+                        filename = f.read().strip()
+                    self._artifact = joblib.load(os.path.join(self.model_dir, filename))
+                    self._loaded_mtime = mtime
+                    self._ewma = None
+                    self.drifted = False
+                    self._retrain_requested = False
+        return self._artifact
+
+    @property
+    def version(self):
+        artifact = self._current()
+        return artifact['version'] if artifact else None
+
+    def score(self, df):
+        """Return (score_samples, labels) for ``df``, or None when no model is trained yet."""
+        artifact = self._current()
+        if artifact is None:
+            return None
+        features = df[FEATURES].fillna(0).to_numpy(dtype=float)
+        model = artifact['model']
+        scores = model.score_samples(features)
+        labels = np.where(scores - model.offset_ < 0, -1, 1)
+        self._track_drift(artifact, features)
+        return scores, labels
+
+    def _track_drift(self, artifact, features):
+        batch_mean = features.mean(axis=0)
+        with self._lock:
+            if self._ewma is None:
+                self._ewma = batch_mean
+            else:
+                self._ewma = (1 - self.drift_alpha) * self._ewma + self.drift_alpha * batch_mean
+            shift = np.abs(self._ewma - artifact['mean']) / artifact['std']
+            if np.any(shift > self.drift_threshold):
+                self.drifted = True
+
+    def should_bootstrap(self):
+        """True at most once per ``bootstrap_retry_seconds`` while no model is being served."""
+        if self._current() is not None:
+            return False
+        with self._lock:
+            now, last = time.monotonic(), self._bootstrap_requested_at
+            if last is not None and now - last < self.bootstrap_retry_seconds:
+                return False
+            self._bootstrap_requested_at = now
+            return True
+
+    def should_retrain(self):
+        """True once per loaded model after drift has been detected."""
+        with self._lock:
+            if self.drifted and not self._retrain_requested:
+                self._retrain_requested = True
+                return True
+            return False
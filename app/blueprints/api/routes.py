@@ -1,12 +1,23 @@
+import hashlib
+import json
+import math
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import urlencode
+from flask import request, Response, stream_with_context
 from flask_restx import Resource, fields
+from sqlalchemy import func
 from app.blueprints.api import api_bp
-from app.extensions import api
-from app.models import Vessel
+from app.extensions import api, csrf, db
+from app.models import TableChange, Vessel
+from app.history import get_track, contacts_at
+from app.ingest import bulk_upsert_vessels, newest_per_vessel
+from app.metrics import instrument
 
 ns = api.namespace('vessels', description='Vessel operations')
 
 vessel_model = api.model('Vessel', {
-    'vessel_id': fields.String(required=True),
+    'vessel_id': fields.String(required=True, attribute='id'),
     'lat': fields.Float,
     'lon': fields.Float,
     'speed': fields.Float,
@@ -16,14 +27,240 @@ vessel_model = api.model('Vessel', {
     'is_friendly': fields.Integer
 })
 
+VESSEL_FIELDS = {
+    'vessel_id': Vessel.id,
+    'lat': Vessel.lat,
+    'lon': Vessel.lon,
+    'speed': Vessel.speed,
+    'heading': Vessel.heading,
+    'timestamp': Vessel.timestamp,
+    'trajectory': Vessel.trajectory,
+    'is_friendly': Vessel.is_friendly,
+}
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+PATCHABLE = {'lat', 'lon', 'speed', 'heading', 'timestamp', 'is_friendly'}
+NULLABLE = {'speed', 'heading', 'is_friendly', 'timestamp'}  # a null timestamp means "now"; lat/lon never clear
+VALID_RANGES = {  # name -> (check, error); bulk writes must be physically plausible
+    'lat': (lambda v: abs(v) <= 90, 'lat must be within [-90, 90]'),
+    'lon': (lambda v: abs(v) <= 180, 'lon must be within [-180, 180]'),
+    'speed': (lambda v: v >= 0, 'speed must not be negative'),
+    'heading': (lambda v: 0 <= v < 360, 'heading must be within [0, 360)'),
+    'is_friendly': (lambda v: v in (0, 1), 'is_friendly must be 0 or 1'),
+}
+
+list_parser = ns.parser()
+list_parser.add_argument('limit', type=int, help=f'Page size (max {MAX_LIMIT})')
+list_parser.add_argument('after', help='Keyset cursor: vessel_id of the last row of the previous page')
+list_parser.add_argument('bbox', help='lat_min,lon_min,lat_max,lon_max')
+list_parser.add_argument('since', type=float, help='Only vessels reported at or after this unix time')
+list_parser.add_argument('until', type=float, help='Only vessels reported at or before this unix time')
+list_parser.add_argument('friendly', type=int, choices=(0, 1))
+list_parser.add_argument('fields', help='Comma-separated projection, e.g. vessel_id,lat,lon (default: all fields)')
+list_parser.add_argument('format', choices=('json', 'ndjson'), help='ndjson streams the full filtered set')
+
+def _bbox(value):
+    try:
+        bbox = [float(part) for part in value.split(',')]
+    except (AttributeError, ValueError):
+        bbox = []
+    if len(bbox) != 4 or not all(map(math.isfinite, bbox)):
+        api.abort(400, 'bbox must be four numbers: lat_min,lon_min,lat_max,lon_max')
+    return bbox
+
+def _filters(args):
+    conditions = []
+    if args.get('bbox'):
+        lat_min, lon_min, lat_max, lon_max = _bbox(args['bbox'])
+        conditions += [Vessel.lat.between(lat_min, lat_max), Vessel.lon.between(lon_min, lon_max)]
+    if args.get('since') is not None:
+        conditions.append(Vessel.timestamp >= args['since'])
+    if args.get('until') is not None:
+        conditions.append(Vessel.timestamp <= args['until'])
+    if args.get('friendly') is not None:
+        conditions.append(Vessel.is_friendly == args['friendly'])
+    return conditions
+
+def _projection(args):
+    names = [name.strip() for name in (args.get('fields') or '').split(',') if name.strip()]
+    names = names or list(VESSEL_FIELDS)
+    unknown = set(names) - set(VESSEL_FIELDS)
+    if unknown:
+        api.abort(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+    if 'vessel_id' not in names:
+        names.insert(0, 'vessel_id')  # needed for the keyset cursor
+    return names
+
+def _validators(conditions):
+    # updated_at is bumped by every upsert and PATCH: its sum moves on any row change,
+    # the count on removals, and the max (or the last delete) gives Last-Modified
+    count, last_modified, version = db.session.execute(
+        db.select(func.count(Vessel.id), func.max(Vessel.updated_at), func.sum(Vessel.updated_at))
+        .where(*conditions)).one()
+    deleted = db.session.get(TableChange, Vessel.__tablename__)
+    if deleted is not None and deleted.deleted_at is not None:
+        last_modified = max(last_modified or 0, deleted.deleted_at)
+    etag = hashlib.sha1(f"{request.query_string.decode()}|{count}|{last_modified!r}|{version!r}".encode()).hexdigest()
+    return f'W/"{etag}"', last_modified
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag.split('"')[1])
+    since = request.headers.get('If-Modified-Since')
+    if since and last_modified is not None:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
 @ns.route('/')
 class VesselList(Resource):
-    @ns.marshal_list_with(vessel_model)
+    @ns.expect(list_parser)
+    @instrument('api_vessel_list')
     def get(self):
-        return Vessel.query.all()
+        args = list_parser.parse_args()
+        if args.get('limit') is not None and args['limit'] < 1:
+            api.abort(400, 'limit must be at least 1')
+        conditions = _filters(args)
+        names = _projection(args)
+        etag, last_modified = _validators(conditions)
+        headers = {'ETag': etag}
+        if last_modified is not None:
+            headers['Last-Modified'] = formatdate(last_modified, usegmt=True)
+        if _not_modified(etag, last_modified):
+            return Response(status=304, headers=headers)
+
+        query = db.select(*[VESSEL_FIELDS[name] for name in names]).where(*conditions).order_by(Vessel.id)
+        if args.get('after'):
+            query = query.where(Vessel.id > args['after'])
+
+        if args.get('format') == 'ndjson':
+            def export():
+                for row in db.session.execute(query.execution_options(yield_per=1000)):
+                    yield json.dumps(dict(zip(names, row))) + '\n'
+            return Response(stream_with_context(export()), mimetype='application/x-ndjson', headers=headers)
+
+        limit = min(args['limit'] if args.get('limit') is not None else DEFAULT_LIMIT, MAX_LIMIT)
+        rows = db.session.execute(query.limit(limit + 1)).all()
+        items = [dict(zip(names, row)) for row in rows[:limit]]
+        if len(rows) > limit:
+            cursor = items[-1]['vessel_id']
+            headers['X-Next-Cursor'] = cursor
+            params = request.args.to_dict()
+            params['after'] = cursor
+            headers['Link'] = f'<{request.base_url}?{urlencode(params)}>; rel="next"'
+        return items, 200, headers
+
+def _check_record(record, required):
+    if not isinstance(record, dict):
+        api.abort(400, 'Each record must be a JSON object')
+    missing = required - set(record)
+    if missing:
+        api.abort(400, f"Each record needs {', '.join(sorted(missing))}")
+    if not isinstance(record['vessel_id'], (str, int)) or isinstance(record['vessel_id'], bool):
+        api.abort(400, 'vessel_id must be a string')
+    for name in PATCHABLE & set(record):
+        value = record[name]
+        if value is None and name in NULLABLE:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            api.abort(400, f"{name} must be a number")
+        valid, message = VALID_RANGES.get(name, (None, None))
+        if valid is not None and not valid(value):
+            api.abort(400, message)
+    record['vessel_id'] = str(record['vessel_id'])
+
+@ns.route('/bulk', endpoint='vessel_bulk')
+class VesselBulk(Resource):
+    def post(self):
+        """Upsert a batch of full position reports (one statement per request)."""
+        records = request.get_json()
+        if not isinstance(records, list):
+            api.abort(400, 'Expected a JSON list of vessel records')
+        for record in records:
+            _check_record(record, {'vessel_id', 'lat', 'lon'})
+            if record.get('timestamp') is None:
+                record['timestamp'] = time.time()
+        return {'upserted': bulk_upsert_vessels(newest_per_vessel(records))}, 200
+
+    def patch(self):
+        """Partially update existing vessels: [{'vessel_id': ..., 'lat': ..., ...}, ...].
+
+        Updates are merged onto the stored rows and written through the ingestion
+        upsert, so stale timestamps are rejected, trajectories are recomputed and
+        positions are appended to the track history.
+        """
+        records = request.get_json()
+        if not isinstance(records, list):
+            api.abort(400, 'Expected a JSON list of vessel updates')
+        for record in records:
+            _check_record(record, {'vessel_id'})
+        now = time.time()
+        for record in records:
+            # A position change without its own timestamp is a report made now
+            if 'timestamp' not in record and {'lat', 'lon'} & set(record):
+                record['timestamp'] = now
+        records = newest_per_vessel(records)
+        ids = [r['vessel_id'] for r in records]
+        existing = {v.id: v for v in Vessel.query.filter(Vessel.id.in_(ids))} if ids else {}
+
+        merged, stale = [], []
+        for record in records:
+            vessel = existing.get(record['vessel_id'])
+            if vessel is None:
+                continue
+            if record.get('timestamp') is not None and vessel.timestamp is not None \
+                    and record['timestamp'] < vessel.timestamp:
+                stale.append(record['vessel_id'])
+                continue
+            row = {name: getattr(vessel, name) for name in PATCHABLE}
+            row.update({k: v for k, v in record.items() if k in PATCHABLE})
+            row['vessel_id'] = vessel.id
+            if row['timestamp'] is None:
+                row['timestamp'] = now
+            merged.append(row)
+        bulk_upsert_vessels(merged)
+        return {
+            'updated': len(merged),
+            'missing': [i for i in ids if i not in existing],
+            'stale': stale,
+        }, 200
+
+# Machine-to-machine endpoints: no browser session, so no CSRF token
+csrf.exempt(f'{__name__}.vessel_bulk')
+
+def _records(frame):
+    # to_dict would emit bare NaN for nulls in float columns, which is not valid JSON
+    frame = frame.astype(object)
+    return frame.where(frame.notna(), None).to_dict(orient='records')
 
 @ns.route('/<id>')
 class VesselResource(Resource):
     @ns.marshal_with(vessel_model)
     def get(self, id):
-        return Vessel.query.get(id)
\ No newline at end of file
+        return Vessel.query.get(id)
+
+@ns.route('/<id>/track')
+class VesselTrack(Resource):
+    def get(self, id):
+        start = request.args.get('start', 0, type=float)
+        end = request.args.get('end', float('inf'), type=float)
+        return _records(get_track(id, start, end))
+
+@ns.route('/at')
+class ContactsAt(Resource):
+    def get(self):
+        lat_min, lon_min, lat_max, lon_max = _bbox(request.args.get('bbox'))
+        at = request.args.get('t', time.time(), type=float)
+        lookback = request.args.get('lookback', 600, type=float)
+        return _records(contacts_at(lat_min, lon_min, lat_max, lon_max, at, lookback))
+
+
+system_ns = api.namespace('system', description='Runtime diagnostics')
+
+@system_ns.route('/models')
+class ModelStats(Resource):
+    def get(self):
+        from app.utils import models
+        return models.stats()
@@ -1,12 +1,11 @@
-from flask import render_template, request, jsonify
+from datetime import datetime
+from flask import render_template, request, jsonify, url_for
 from app.blueprints.dashboard import dashboard_bp
 from app.models import Vessel
-from app.utils import predict_trajectory, save_vessel_to_db, remove_vessel_from_db, generate_alerts
+from app.utils import predict_trajectory, generate_alerts
+from app.ingest import save_vessel_to_db, remove_vessel_from_db
 from app.extensions import db
-from app.agents.orchestrator import orchestrate_workflow
-from app.mcp import MCP
-
-mcp = MCP(Config.ANTHROPIC_API_KEY)
+from app.workflow import contact_image_path, enqueue_contact, get_job_status, save_contact_image
 
 @dashboard_bp.route('/dashboard', methods=['GET', 'POST'])
 def dashboard():
@@ -17,6 +16,9 @@ def dashboard():
 @dashboard_bp.route('/add_vessel', methods=['POST'])
 def add_vessel():
     data = request.json
+    image_id = data.get('image_id')
+    if image_id is not None and contact_image_path(image_id) is None:
+        return jsonify({'error': 'Unknown image_id; upload it to /contact_images first'}), 400
     trajectory = predict_trajectory(data['lat'], data['lon'], data['speed'], data['heading'], data['time_minutes'])
     vessel = {
         'vessel_id': data['vessel_id'],
@@ -27,9 +29,31 @@ def add_vessel():
         'timestamp': datetime.now().timestamp()
     }
     save_vessel_to_db(vessel, trajectory, data['is_friendly'])
-    # Trigger agentic workflow
-    orchestrate_workflow(mcp, {'vessel_df': pd.DataFrame([vessel])})
-    return jsonify({'success': True})
+    # Agentic workflow runs on Celery, micro-batched with other new contacts
+    job_id = enqueue_contact(vessel, image_id=image_id)
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('dashboard.workflow_job', job_id=job_id),
+    }), 202
+
+@dashboard_bp.route('/contact_images', methods=['POST'])
+def upload_contact_image():
+    upload = request.files.get('image')
+    image_id = save_contact_image(upload) if upload else None
+    if image_id is None:
+        return jsonify({'error': 'Expected an image file in the "image" field'}), 400
+    # Read it now on a worker, so the detection pass gets a cache hit
+    from app.tasks import ocr_batch
+    ocr_batch.delay([contact_image_path(image_id)])
+    return jsonify({'image_id': image_id}), 201
+
+@dashboard_bp.route('/workflow_jobs/<job_id>')
+def workflow_job(job_id):
+    job = get_job_status(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job)
 
 @dashboard_bp.route('/remove_vessel', methods=['POST'])
 def remove_vessel():
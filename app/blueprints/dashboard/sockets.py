@@ -1,15 +1,45 @@
-from flask_socketio import emit
+from flask import current_app
+from flask_socketio import emit, join_room
 from app.extensions import socketio
-from app.utils import update_ais_data, generate_alerts
-from app.models import Vessel
+from app.broadcast import DeltaBroadcaster
+from app.tracks import track_store
+from app.utils import generate_alerts, known_course, predict_trajectory_batch, proximity_engine, alert_engine
+
+PREDICTION_MINUTES = 30
+
+broadcaster = DeltaBroadcaster(socketio, '/dashboard')
+
+@broadcaster.on_delta
+def attach_alerts(delta, changed):
+    # Only added, moved or removed vessels can change alert state
+    alerts = []
+    if not changed.empty:
+        # A contact without a known speed or course is predicted where it is, not as NaN;
+        # one without a position has no track at all
+        located = changed.dropna(subset=['lat', 'lon'])
+        speed, heading = known_course(located['speed'], located['heading'])
+        trajectories = predict_trajectory_batch(located['lat'], located['lon'], speed, heading, PREDICTION_MINUTES)
+        alerts = generate_alerts(located, trajectories, current_app.boundaries)
+        # Encounters are assessed fleet-wide but reported only for pairs involving a changed vessel
+        pairs = proximity_engine.assess_frame(broadcaster.state.dropna(subset=['lat', 'lon']))
+        alerts += proximity_engine.alerts(pairs, only_ids=changed['vessel_id'])
+    scope = set(changed['vessel_id']) | set(delta['removed'])
+    delta['alerts'] = alert_engine.evaluate(alerts, scope=scope)
+    alert_engine.maybe_flush()
+
+@broadcaster.on_delta
+def sync_track_store(delta, changed):
+    track_store.upsert_many(delta['added'] + delta['updated'])
+    track_store.remove(delta['removed'])
 
 @socketio.on('connect', namespace='/dashboard')
 def connect():
+    join_room(broadcaster.room)
+    broadcaster.ensure_started()
     emit('connected', {'data': 'Connected'})
+    emit('data_snapshot', broadcaster.encode(broadcaster.snapshot()))
 
 @socketio.on('update_data', namespace='/dashboard')
 def update_data():
-    df = pd.DataFrame([v.to_dict() for v in Vessel.query.all()])  # Simplified
-    updated_df = update_ais_data(df)
-    alerts = [generate_alerts(row, trajectories, maritime_boundary) for _, row in updated_df.iterrows()]
-    emit('data_update', {'vessels': updated_df.to_dict(orient='records'), 'alerts': alerts})
\ No newline at end of file
+    # Served from the broadcaster's cached state; changes arrive as 'data_delta'
+    emit('data_snapshot', broadcaster.encode(broadcaster.snapshot()))
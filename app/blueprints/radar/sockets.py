@@ -1,11 +1,81 @@
+import math
+from flask import current_app, request
 from flask_socketio import emit
 from app.extensions import socketio
+from app.metrics import timed
+from app.tracks import track_store
+from app.blueprints.dashboard.sockets import broadcaster
+
+subscriptions = {}  # sid -> viewport
+_sweep_started = False
+
+def _blips(viewport):
+    if 'bbox' in viewport:
+        return track_store.query_bbox(*viewport['bbox'])
+    return track_store.query_range(viewport['lat'], viewport['lon'], viewport['range_nm'])
+
+def _parse_viewport(data):
+    """Validated viewport, or None when ``data`` is not one of the two accepted shapes."""
+    try:
+        if 'bbox' in data:
+            lat_min, lon_min, lat_max, lon_max = map(float, data['bbox'])
+            viewport = {'bbox': (lat_min, lon_min, lat_max, lon_max)}
+            values = viewport['bbox']
+        else:
+            viewport = {'lat': float(data['lat']), 'lon': float(data['lon']),
+                        'range_nm': float(data.get('range_nm', current_app.config['RADAR_DEFAULT_RANGE_NM']))}
+            values = viewport.values()
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not all(map(math.isfinite, values)) or viewport.get('range_nm', 0.0) < 0:
+        return None
+    return viewport
+
+def _reject_viewport():
+    emit('radar_error', {'error': "Viewport must be {'lat', 'lon', 'range_nm'} or "
+                                  "{'bbox': [lat_min, lon_min, lat_max, lon_max]} with finite numbers"})
+
+def _sweep(app, interval):
+    while True:
+        for sid, viewport in list(subscriptions.items()):
+            try:
+                with timed('socket_emit_radar'):
+                    socketio.emit('radar_update', {'blips': _blips(viewport)}, to=sid, namespace='/radar')
+            except Exception:
+                # One bad subscriber must not stop the sweep for every other client
+                app.logger.exception("Radar sweep failed for %s", sid)
+        socketio.sleep(interval)
+
+def _ensure_sweep():
+    global _sweep_started
+    if not _sweep_started:
+        _sweep_started = True
+        socketio.start_background_task(_sweep, current_app._get_current_object(),
+                                       current_app.config['RADAR_SWEEP_SECONDS'])
 
 @socketio.on('connect', namespace='/radar')
 def connect():
+    # The dashboard broadcaster keeps the track store in sync with the database
+    broadcaster.ensure_started()
     emit('connected', {'data': 'Connected'})
 
+@socketio.on('disconnect', namespace='/radar')
+def disconnect():
+    subscriptions.pop(request.sid, None)
+
+@socketio.on('subscribe', namespace='/radar')
+def subscribe(data):
+    """Viewport is either {'lat', 'lon', 'range_nm'} or {'bbox': [lat_min, lon_min, lat_max, lon_max]}."""
+    viewport = _parse_viewport(data)
+    if viewport is None:
+        return _reject_viewport()
+    subscriptions[request.sid] = viewport
+    _ensure_sweep()
+    emit('radar_update', {'blips': _blips(subscriptions[request.sid])})
+
 @socketio.on('update_radar', namespace='/radar')
-def update_radar():
-    # Fetch vessel data, emit for radar blips
-    emit('radar_update', {'blips': []})  # Placeholder
\ No newline at end of file
+def update_radar(data=None):
+    viewport = _parse_viewport(data) if data else subscriptions.get(request.sid)
+    if data and viewport is None:
+        return _reject_viewport()
+    emit('radar_update', {'blips': _blips(viewport) if viewport else []})
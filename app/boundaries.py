@@ -0,0 +1,85 @@
+import json
+import numpy as np
+import shapely
+from shapely.geometry import LinearRing, LineString
+from shapely.prepared import prep
+from shapely.strtree import STRtree
+
+
+def _track_lines(trajectories):
+    """Linestrings for an (N, S, 2) array of [lat, lon] tracks, safe across the antimeridian.
+
+    Longitudes are unwrapped so a track crossing +/-180 stays continuous instead of
+    spanning the globe; the part past the antimeridian is added again shifted by 360
+    degrees. Returns the lines and, for each line, the index of its track.
+    """
+    tracks = trajectories.copy()
+    tracks[..., 1] = np.unwrap(tracks[..., 1], period=360.0, axis=-1)
+    lines, owners = [shapely.linestrings(tracks)], [np.arange(len(tracks))]
+    for shift, past in ((-360.0, tracks[..., 1].max(axis=-1) > 180), (360.0, tracks[..., 1].min(axis=-1) < -180)):
+        index = np.flatnonzero(past)
+        if len(index):
+            shifted = tracks[index]
+            shifted[..., 1] += shift
+            lines.append(shapely.linestrings(shifted))
+            owners.append(index)
+    return np.concatenate(lines), np.concatenate(owners)
+
+
+class BoundaryRegistry:
+    """Maritime boundaries built and prepared once, queried in bulk.
+
+    Each boundary is a closed polygon given as [[lat, lon], ...]. Its outline is kept
+    as a prepared geometry for single-track checks, and the segments of every boundary
+    go into one STRtree so a whole fleet of trajectories is tested in a single query.
+    """
+
+    def __init__(self, boundaries=None):
+        self.names = []
+        self._outlines = {}
+        self._segments = []
+        self._owners = []
+        self._tree = None
+        for name, coords in (boundaries or {}).items():
+            self.register(name, coords)
+
+    @classmethod
+    def from_file(cls, path):
+        if not path:
+            return cls()
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def register(self, name, coords):
+        if name in self._outlines:
+            raise ValueError(f"Boundary already registered: {name}")
+        ring = LinearRing(coords)
+        index = len(self.names)
+        self.names.append(name)
+        self._outlines[name] = prep(ring)
+        points = list(ring.coords)
+        for i in range(len(points) - 1):
+            self._segments.append(LineString([points[i], points[i + 1]]))
+            self._owners.append(index)
+        self._tree = None
+
+    def crosses(self, name, trajectory):
+        lines, _ = _track_lines(np.asarray([trajectory], dtype=float))
+        return any(self._outlines[name].intersects(line) for line in lines)
+
+    def crossings(self, trajectories):
+        """Return an (N, len(names)) bool matrix of which trajectories cross which boundaries."""
+        trajectories = np.asarray(trajectories, dtype=float)
+        result = np.zeros((len(trajectories), len(self.names)), dtype=bool)
+        if not len(trajectories) or not self._segments:
+            return result
+        if self._tree is None:
+            self._tree = STRtree(self._segments)
+        lines, tracks = _track_lines(trajectories)
+        line_idx, segment_idx = self._tree.query(lines, predicate='intersects')
+        result[tracks[line_idx], np.asarray(self._owners)[segment_idx]] = True
+        return result
+
+    def crossed_names(self, trajectories):
+        matrix = self.crossings(trajectories)
+        return [[self.names[j] for j in np.flatnonzero(row)] for row in matrix]
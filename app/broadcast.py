@@ -0,0 +1,154 @@
+import threading
+import numpy as np
+import pandas as pd
+from app.extensions import db
+from app.metrics import instrument, timed
+from app.models import Vessel
+
+try:
+    import msgpack
+except ImportError:  # Optional: only needed for DASHBOARD_ENCODING = 'msgpack'
+    msgpack = None
+
+EARTH_RADIUS_M = 6371008.8
+COLUMNS = ['vessel_id', 'lat', 'lon', 'speed', 'heading', 'timestamp', 'is_friendly']
+
+
+def _distance_m(lat1, lon1, lat2, lon2):
+    # Equirectangular approximation, accurate enough for change thresholds
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    x = (lon2 - lon1) * np.cos((lat1 + lat2) / 2)
+    return EARTH_RADIUS_M * np.hypot(x, lat2 - lat1)
+
+
+def _null_changed(cur, prev):
+    # A value appearing or disappearing is a change; NULL on both sides is not
+    return (cur.isna() ^ prev.isna()).to_numpy()
+
+
+class DeltaBroadcaster:
+    """Pushes fleet changes to a Socket.IO room at a fixed tick rate.
+
+    One background task per process loads the fleet once per tick, diffs it against
+    the last emitted state and emits only added, moved and removed vessels. Newly
+    joined clients get the cached snapshot without touching the database.
+    """
+
+    def __init__(self, socketio, namespace, room='fleet', event='data_delta'):
+        self.socketio = socketio
+        self.namespace = namespace
+        self.room = room
+        self.event = event
+        self.app = None
+        self.seq = 0
+        self._state = pd.DataFrame(columns=COLUMNS).set_index('vessel_id')
+        self._lock = threading.Lock()
+        self._started = False
+        self._hooks = []
+
+    def init_app(self, app):
+        self.app = app
+        self.tick_seconds = app.config['DASHBOARD_TICK_SECONDS']
+        self.move_threshold_m = app.config['DASHBOARD_MOVE_THRESHOLD_M']
+        self.encoding = app.config['DASHBOARD_ENCODING']
+        if self.encoding == 'msgpack' and msgpack is None:
+            raise RuntimeError("DASHBOARD_ENCODING='msgpack' requires the msgpack package")
+
+    def on_delta(self, hook):
+        """Register ``hook(delta, changed_df)``; it runs every tick, before any delta is emitted."""
+        self._hooks.append(hook)
+        return hook
+
+    def ensure_started(self):
+        with self._lock:
+            if not self._started:
+                self._started = True
+                self.socketio.start_background_task(self._run)
+
+    @property
+    def state(self):
+        """Last emitted fleet state as a DataFrame with a ``vessel_id`` column."""
+        return self._state.reset_index()
+
+    def snapshot(self):
+        return {'seq': self.seq, 'vessels': self._records(self._state)}
+
+    def encode(self, payload):
+        if self.encoding == 'msgpack':
+            return msgpack.packb(payload, use_bin_type=True)
+        return payload
+
+    def _run(self):
+        while True:
+            with self.app.app_context():
+                try:
+                    self.tick()
+                except Exception:
+                    self.app.logger.exception("Dashboard broadcast tick failed")
+                finally:
+                    db.session.remove()
+            self.socketio.sleep(self.tick_seconds)
+
+    def load(self):
+        query = db.select(Vessel.id.label('vessel_id'), Vessel.lat, Vessel.lon, Vessel.speed,
+                          Vessel.heading, Vessel.timestamp, Vessel.is_friendly)
+        return pd.read_sql(query, db.engine)
+
+    @instrument('dashboard_tick')
+    def tick(self):
+        previous = self._state
+        delta, changed = self.diff(self.load())
+        try:
+            # Hooks run on quiet ticks too, so time-based state (alert hysteresis) advances
+            for hook in self._hooks:
+                hook(delta, changed)
+            if not (delta['added'] or delta['updated'] or delta['removed'] or delta.get('alerts')):
+                return None
+            with timed('socket_emit_dashboard'):
+                self.socketio.emit(self.event, self.encode(delta), to=self.room, namespace=self.namespace)
+        except Exception:
+            # Nothing was delivered; keep the old state so the next tick sends these changes again
+            self._state = previous
+            raise
+        return delta
+
+    def diff(self, df):
+        """Diff ``df`` against the last emitted state; returns (delta, changed rows)."""
+        current = df[COLUMNS].drop_duplicates('vessel_id', keep='last').set_index('vessel_id')
+        previous = self._state
+        removed = previous.index.difference(current.index)
+        added = current.index.difference(previous.index)
+        common = current.index.intersection(previous.index)
+
+        cur, prev = current.loc[common], previous.loc[common]
+        moved = _distance_m(prev['lat'].to_numpy(float), prev['lon'].to_numpy(float),
+                            cur['lat'].to_numpy(float), cur['lon'].to_numpy(float)) > self.move_threshold_m
+        heading_change = np.abs((cur['heading'] - prev['heading'] + 180) % 360 - 180)
+        friendly = cur['is_friendly'].ne(prev['is_friendly']) & ~(cur['is_friendly'].isna() & prev['is_friendly'].isna())
+        changed_mask = (moved | _null_changed(cur['lat'], prev['lat']) | _null_changed(cur['lon'], prev['lon'])
+                        | ((cur['speed'] - prev['speed']).abs() > 0.1).to_numpy()
+                        | _null_changed(cur['speed'], prev['speed'])
+                        | (heading_change > 1).to_numpy() | _null_changed(cur['heading'], prev['heading'])
+                        | friendly.to_numpy())
+        updated = common[changed_mask]
+
+        # Sub-threshold moves keep their last emitted values so drift accumulates
+        state = current.copy()
+        unchanged = common[~changed_mask]
+        state.loc[unchanged] = previous.loc[unchanged]
+        self._state = state
+        self.seq += 1
+
+        changed = current.loc[added.union(updated)].reset_index()
+        delta = {
+            'seq': self.seq,
+            'added': self._records(current.loc[added]),
+            'updated': self._records(current.loc[updated]),
+            'removed': list(removed),
+        }
+        return delta, changed
+
+    @staticmethod
+    def _records(frame):
+        frame = frame.reset_index().astype(object)
+        return frame.where(frame.notna(), None).to_dict(orient='records')
@@ -0,0 +1,141 @@
+import time
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from sqlalchemy import func, text
+from app.extensions import db
+from app.models import TrackPoint, POSTGIS_ENABLED
+
+DAY_SECONDS = 86400
+
+
+def _insert_for_dialect():
+    """The dialect ``insert`` with ON CONFLICT support, or None (callers fall back to merge)."""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+
+def record_track_points(records):
+    """Append position reports to the history table; duplicates are ignored."""
+    if not records:
+        return 0
+    rows = [{
+        'vessel_id': r['vessel_id'],
+        'timestamp': r['timestamp'],
+        'lat': r['lat'],
+        'lon': r['lon'],
+        'speed': r.get('speed'),
+        'heading': r.get('heading'),
+    } for r in records]
+    if POSTGIS_ENABLED:
+        for row in rows:
+            row['geom'] = f"SRID=4326;POINT({row['lon']} {row['lat']})"
+
+    insert = _insert_for_dialect()
+    if insert is None:
+        for row in rows:
+            db.session.merge(TrackPoint(**row))
+        db.session.commit()
+        return len(rows)
+    db.session.execute(insert(TrackPoint.__table__).on_conflict_do_nothing(), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def get_track(vessel_id, start, end):
+    """Track of one vessel between two unix timestamps, oldest first."""
+    query = (db.select(TrackPoint.timestamp, TrackPoint.lat, TrackPoint.lon, TrackPoint.speed, TrackPoint.heading)
+             .where(TrackPoint.vessel_id == vessel_id, TrackPoint.timestamp.between(start, end))
+             .order_by(TrackPoint.timestamp))
+    return pd.read_sql(query, db.engine)
+
+
+def contacts_at(lat_min, lon_min, lat_max, lon_max, at, lookback_seconds=600):
+    """Last known position of every contact inside the box at time ``at``.
+
+    Only reports from the ``lookback_seconds`` before ``at`` count, so the scan is
+    bounded to a short time slice of the history.
+    """
+    latest = (db.select(TrackPoint.vessel_id, func.max(TrackPoint.timestamp).label('timestamp'))
+              .where(TrackPoint.timestamp.between(at - lookback_seconds, at))
+              .group_by(TrackPoint.vessel_id)
+              .subquery())
+    query = (db.select(TrackPoint.vessel_id, TrackPoint.timestamp, TrackPoint.lat, TrackPoint.lon,
+                       TrackPoint.speed, TrackPoint.heading)
+             .join(latest, (TrackPoint.vessel_id == latest.c.vessel_id) & (TrackPoint.timestamp == latest.c.timestamp)))
+    if POSTGIS_ENABLED:
+        query = query.where(TrackPoint.geom.intersects(func.ST_MakeEnvelope(lon_min, lat_min, lon_max, lat_max, 4326)))
+    else:
+        query = query.where(TrackPoint.lat.between(lat_min, lat_max), TrackPoint.lon.between(lon_min, lon_max))
+    return pd.read_sql(query, db.engine)
+
+
+def _partition_name(day):
+    return f"track_point_p{day:%Y%m%d}"
+
+
+def ensure_partitions(conn, days_ahead, now=None):
+    """Create the daily partitions for today and the next ``days_ahead`` days on Postgres.
+
+    ``conn`` is a connection or session. If rows for a missing day already sit in
+    the default partition (e.g. the scheduler was down), they are moved into the
+    new partition in the same transaction instead of making the CREATE fail.
+    """
+    now = now or time.time()
+    today = datetime.fromtimestamp(now, timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    created = []
+    for offset in range(days_ahead + 1):
+        day = today + timedelta(days=offset)
+        name = _partition_name(day)
+        if conn.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar() is not None:
+            continue
+        start, end = day.timestamp(), day.timestamp() + DAY_SECONDS
+        conn.execute(text("CREATE TEMP TABLE track_point_moving (LIKE track_point) ON COMMIT DROP"))
+        conn.execute(text(
+            "WITH moved AS (DELETE FROM track_point_default WHERE timestamp >= :start AND timestamp < :end RETURNING *) "
+            "INSERT INTO track_point_moving SELECT * FROM moved"
+        ), {'start': start, 'end': end})
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF track_point FOR VALUES FROM ({start}) TO ({end})"))
+        conn.execute(text("INSERT INTO track_point SELECT * FROM track_point_moving"))
+        conn.execute(text("DROP TABLE track_point_moving"))
+        created.append(name)
+    return created
+
+
+def manage_partitions(retention_days, days_ahead=7, now=None):
+    """Create upcoming daily partitions and drop expired ones.
+
+    On Postgres, retention drops whole partitions and purges expired rows from the
+    default partition; other databases fall back to a range delete on the
+    timestamp column.
+    """
+    now = now or time.time()
+    cutoff = now - retention_days * DAY_SECONDS
+    if db.engine.dialect.name != 'postgresql':
+        deleted = TrackPoint.query.filter(TrackPoint.timestamp < cutoff).delete()
+        db.session.commit()
+        return {'created': [], 'dropped': [], 'deleted': deleted}
+
+    created = ensure_partitions(db.session, days_ahead, now)
+    dropped = []
+
+    partitions = db.session.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = 'track_point'"
+    )).scalars()
+    for name in partitions:
+        if not name.startswith('track_point_p'):
+            continue
+        day = datetime.strptime(name[len('track_point_p'):], '%Y%m%d').replace(tzinfo=timezone.utc)
+        if day.timestamp() + DAY_SECONDS <= cutoff:
+            db.session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+    deleted = db.session.execute(text("DELETE FROM track_point_default WHERE timestamp < :cutoff"),
+                                 {'cutoff': cutoff}).rowcount
+    db.session.commit()
+    return {'created': created, 'dropped': dropped, 'deleted': deleted}
@@ -0,0 +1,242 @@
+import json
+import queue
+import socket
+import sys
+import threading
+import time
+from itertools import islice
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func
+from app.ais import decode_nmea_batch, decode_csv_batch
+from app.extensions import db
+from app.history import _insert_for_dialect, record_track_points
+from app.metrics import timed
+from app.models import TableChange, Vessel
+from app.utils import known_course, predict_trajectory_batch
+
+TRAJECTORY_MINUTES = 30
+
+
+def newest_per_vessel(records):
+    """Keep only the newest record per vessel_id (ON CONFLICT may touch a row once per statement)."""
+    newest = {}
+    for record in records:
+        current = newest.get(record['vessel_id'])
+        if current is None or (record.get('timestamp') or 0) >= (current.get('timestamp') or 0):
+            newest[record['vessel_id']] = record
+    return list(newest.values())
+
+
+def bulk_upsert_vessels(records, trajectory_minutes=TRAJECTORY_MINUTES):
+    """Write vessel records with one INSERT ... ON CONFLICT statement per batch.
+
+    Older reports never overwrite newer ones, and a missing ``is_friendly`` keeps
+    the stored classification.
+    """
+    records = newest_per_vessel(records)
+    if not records:
+        return 0
+    updated_at = time.time()
+    rows = [{
+        'id': r['vessel_id'],
+        'lat': r['lat'],
+        'lon': r['lon'],
+        'speed': r.get('speed'),
+        'heading': r.get('heading'),
+        'timestamp': r.get('timestamp'),
+        'is_friendly': r.get('is_friendly'),
+        'trajectory': json.dumps(r['trajectory']) if r.get('trajectory') is not None else None,
+        'updated_at': updated_at,
+    } for r in records]
+    missing = [row for row in rows if row['trajectory'] is None]
+    if trajectory_minutes and missing:
+        speed, heading = known_course([r['speed'] for r in missing], [r['heading'] for r in missing])
+        trajectories = predict_trajectory_batch([r['lat'] for r in missing], [r['lon'] for r in missing],
+                                                speed, heading, trajectory_minutes)
+        for row, trajectory in zip(missing, trajectories):
+            row['trajectory'] = json.dumps(trajectory.tolist())
+
+    table = Vessel.__table__
+    insert = _insert_for_dialect()
+    if insert is None:
+        for row in rows:
+            db.session.merge(Vessel(**row))
+        db.session.commit()
+        record_track_points(records)
+        return len(rows)
+
+    stmt = insert(table)
+    updates = {c: stmt.excluded[c] for c in ('lat', 'lon', 'speed', 'heading', 'timestamp', 'trajectory', 'updated_at')}
+    updates['is_friendly'] = func.coalesce(stmt.excluded.is_friendly, table.c.is_friendly)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_=updates,
+        where=(table.c.timestamp.is_(None)) | (table.c.timestamp <= stmt.excluded.timestamp),
+    )
+    db.session.execute(stmt, rows)
+    db.session.commit()
+    record_track_points(records)
+    return len(rows)
+
+
+def save_vessel_to_db(vessel, trajectory, is_friendly):
+    return bulk_upsert_vessels([dict(vessel, trajectory=trajectory, is_friendly=is_friendly)])
+
+
+def remove_vessel_from_db(vessel_id):
+    if Vessel.query.filter_by(id=vessel_id).delete():
+        db.session.merge(TableChange(table=Vessel.__tablename__, deleted_at=time.time()))
+    db.session.commit()
+
+
+class IngestPipeline:
+    """Coalesces decoded reports per MMSI and flushes them in bulk.
+
+    Within each ``window_seconds`` only the newest report per vessel survives, so a
+    chatty transponder costs one row in the next upsert rather than one commit per
+    sentence. A flush also happens early once ``max_batch`` vessels are pending.
+    """
+
+    def __init__(self, writer=bulk_upsert_vessels, window_seconds=1.0, max_batch=5000):
+        self.writer = writer
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self.pending = {}
+        self.received = 0
+        self.written = 0
+        self._window_start = time.monotonic()
+
+    def add(self, records):
+        for record in records:
+            current = self.pending.get(record['vessel_id'])
+            if current is None or record['timestamp'] >= current['timestamp']:
+                self.pending[record['vessel_id']] = record
+        self.received += len(records)
+        if len(self.pending) >= self.max_batch or time.monotonic() - self._window_start >= self.window_seconds:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            with timed('ingest_flush'):
+                self.written += self.writer(list(self.pending.values()))
+            self.pending = {}
+        self._window_start = time.monotonic()
+
+
+def open_source(source):
+    """Yield text lines from ``-`` (stdin), ``tcp://host:port`` or a file path."""
+    if source == '-':
+        yield from sys.stdin
+    elif source.startswith('tcp://'):
+        host, port = source[len('tcp://'):].rsplit(':', 1)
+        with socket.create_connection((host, int(port))) as conn:
+            yield from conn.makefile('r', encoding='ascii', errors='ignore')
+    else:
+        with open(source, encoding='utf-8', errors='ignore') as f:
+            yield from f
+
+
+def _timed_chunks(lines, batch_size, max_wait):
+    """Chunks of up to ``batch_size`` lines, each closed after at most ``max_wait`` seconds.
+
+    Lines are read on a background thread, so a quiet live feed still yields (possibly
+    empty) chunks and the pipeline gets to flush its window on time.
+    """
+    lines_q = queue.Queue(batch_size * 4)
+    done, failure = object(), []
+
+    def pump():
+        try:
+            for line in lines:
+                lines_q.put(line)
+        except Exception as exc:
+            failure.append(exc)
+        finally:
+            lines_q.put(done)
+
+    threading.Thread(target=pump, name='ingest-reader', daemon=True).start()
+    while True:
+        chunk, deadline = [], time.monotonic() + max_wait
+        while len(chunk) < batch_size:
+            try:
+                line = lines_q.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if line is done:
+                if chunk:
+                    yield chunk
+                if failure:
+                    raise failure[0]
+                return
+            chunk.append(line)
+        yield chunk
+
+
+def decoded_batches(lines, fmt='nmea', batch_size=1000, max_wait=None):
+    """Decode ``lines`` in batches; with ``max_wait`` a batch never waits longer than that."""
+    lines = iter(lines)
+    fieldnames = None
+    if fmt == 'csv':
+        header = next(lines, None)
+        if header is None:
+            return
+        fieldnames = [name.strip() for name in header.split(',')]
+    if max_wait is None:
+        chunks = iter(lambda: list(islice(lines, batch_size)), [])
+    else:
+        chunks = _timed_chunks(lines, batch_size, max_wait)
+    for chunk in chunks:
+        with timed('ingest_decode'):
+            records = decode_csv_batch(chunk, fieldnames) if fmt == 'csv' else decode_nmea_batch(chunk)
+        yield records
+
+
+def replay(batches, speed=1.0):
+    """Re-emit recorded reports paced by their own timestamps, ``speed`` times faster.
+
+    ``speed=0`` replays as fast as possible.
+    """
+    start_wall = start_feed = None
+    for batch in batches:
+        if not speed or not batch:
+            yield batch
+            continue
+        batch.sort(key=lambda record: record['timestamp'])
+        for record in batch:
+            if start_feed is None:
+                start_wall, start_feed = time.monotonic(), record['timestamp']
+            delay = (record['timestamp'] - start_feed) / speed - (time.monotonic() - start_wall)
+            if delay > 0:
+                time.sleep(delay)
+            yield [record]
+
+
+def run_ingest(source, fmt='nmea', replay_speed=None, window_seconds=1.0, batch_size=1000, pipeline=None):
+    pipeline = pipeline or IngestPipeline(window_seconds=window_seconds)
+    # Live feeds can go quiet mid-batch; bound the wait so pending reports still flush
+    live = source == '-' or source.startswith('tcp://')
+    batches = decoded_batches(open_source(source), fmt, batch_size, max_wait=window_seconds if live else None)
+    if replay_speed is not None:
+        batches = replay(batches, replay_speed)
+    for batch in batches:
+        pipeline.add(batch)
+    pipeline.flush()
+    return pipeline
+
+
+@click.command('ingest')
+@click.argument('source', default='-')
+@click.option('--format', 'fmt', type=click.Choice(['nmea', 'csv']), default='nmea')
+@click.option('--replay', 'replay_speed', type=float, default=None,
+              help='Pace a recorded feed by its timestamps at this speed-up (0 = as fast as possible).')
+@click.option('--window', 'window_seconds', type=float, default=1.0, help='Coalescing window in seconds.')
+@click.option('--batch-size', type=int, default=1000, help='Sentences decoded per batch.')
+@with_appcontext
+def ingest_command(source, fmt, replay_speed, window_seconds, batch_size):
+    """Ingest AIS reports from SOURCE (file path, tcp://host:port or - for stdin)."""
+    started = time.monotonic()
+    pipeline = run_ingest(source, fmt, replay_speed, window_seconds, batch_size)
+    elapsed = time.monotonic() - started
+    click.echo(f"{pipeline.received} reports, {pipeline.written} rows upserted in {elapsed:.1f}s "
+               f"({pipeline.received / max(elapsed, 1e-9):.0f} reports/s)")
@@ -1,26 +1,145 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import anthropic
+from app.cache import TTLCache
+from app.metrics import timed
+
+CHARS_PER_TOKEN = 4  # Rough estimate; good enough for budgeting
+
+
+def estimate_tokens(content):
+    if isinstance(content, str):
+        return len(content) // CHARS_PER_TOKEN + 1
+    total = 0
+    for block in content or []:
+        text = block.get('text') if isinstance(block, dict) else getattr(block, 'text', None)
+        total += estimate_tokens(text if text is not None else str(block))
+    return total
+
+
+class Session:
+    def __init__(self):
+        self.messages = []
+        self.summary = None
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    def tokens(self):
+        return sum(estimate_tokens(m['content']) for m in self.messages) + estimate_tokens(self.summary or '')
+
 
 class MCP:
-    def __init__(self, api_key):
+    """Anthropic client with bounded, per-session conversation context.
+
+    Sessions are keyed per agent and incident (see ``session_key``). Each session is
+    kept under ``max_context_tokens`` by dropping its oldest turns, optionally
+    folding them into a rolling summary first. Idle sessions are evicted LRU-first
+    once there are more than ``max_sessions`` or they exceed ``idle_seconds``.
+    Calls on different sessions run concurrently through ``submit``/``send_many``.
+    """
+
+    def __init__(self, api_key, max_context_tokens=8000, max_sessions=256, idle_seconds=3600,
+                 summarize=False, response_cache_ttl=0, max_workers=4):
         self.client = anthropic.Anthropic(api_key=api_key)
-        self.context_cache = {}  # Persistent context per session/agent
+        self.max_context_tokens = max_context_tokens
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.summarize = summarize
+        self.response_cache = TTLCache(1024, response_cache_ttl) if response_cache_ttl else None
+        self.context_cache = OrderedDict()  # session_id -> Session
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='mcp')
+
+    @staticmethod
+    def session_key(agent, incident_id=None):
+        return f"{agent}:{incident_id}" if incident_id else agent
+
+    def _session(self, session_id):
+        with self._lock:
+            session = self.context_cache.pop(session_id, None) or Session()
+            session.last_used = time.monotonic()
+            self.context_cache[session_id] = session
+            self._evict()
+            return session
+
+    def _evict(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        while self.context_cache:
+            oldest_id, oldest = next(iter(self.context_cache.items()))
+            if len(self.context_cache) <= self.max_sessions and oldest.last_used >= cutoff:
+                break
+            del self.context_cache[oldest_id]
+
+    def _fit_budget(self, session, model):
+        dropped = []
+        # Always keep the newest user turn; drop whole user/assistant pairs from the front
+        while session.tokens() > self.max_context_tokens and len(session.messages) > 1:
+            dropped.extend(session.messages[:2])
+            del session.messages[:2]
+        if dropped and self.summarize:
+            session.summary = self._summarize(session.summary, dropped, model)
+
+    def _summarize(self, summary, messages, model):
+        transcript = '\n'.join(f"{m['role']}: {self.text(m['content'])}" for m in messages)
+        prompt = (f"Previous summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}\n\n"
+                  "Update the summary, keeping facts, vessel ids and decisions. Be brief.")
+        response = self.client.messages.create(model=model, max_tokens=300,
+                                               messages=[{"role": "user", "content": prompt}])
+        return self.text(response.content)
+
+    @staticmethod
+    def text(content):
+        if isinstance(content, str):
+            return content
+        return ' '.join(getattr(block, 'text', '') or (block.get('text', '') if isinstance(block, dict) else '')
+                        for block in content)
+
+    def send_message_with_context(self, session_id, message, model="claude-3-sonnet-20240229", tools=None, cache=False):
+        session = self._session(session_id)
+        with session.lock:
+            session.messages.append({"role": "user", "content": message})
+            self._fit_budget(session, model)
+            request = {
+                'model': model,
+                'messages': list(session.messages),
+                'tools': tools or [],
+                'max_tokens': 1000,
+            }
+            if session.summary:
+                request['system'] = f"Summary of the earlier conversation:\n{session.summary}"
 
-    def send_message_with_context(self, session_id, message, model="claude-3-sonnet-20240229", tools=None):
-        if session_id not in self.context_cache:
-            self.context_cache[session_id] = []
+            key = None
+            if cache and self.response_cache is not None:
+                payload = json.dumps(request, default=lambda o: getattr(o, 'text', str(o)), sort_keys=True)
+                key = hashlib.sha256(payload.encode()).hexdigest()
+                content = self.response_cache.get(key)
+                if content is not None:
+                    session.messages.append({"role": "assistant", "content": content})
+                    return content
 
-        self.context_cache[session_id].append({"role": "user", "content": message})
+            try:
+                with timed('mcp_call'):
+                    response = self.client.messages.create(**request)
+            except Exception:
+                session.messages.pop()
+                raise
+            if key is not None:
+                self.response_cache.put(key, response.content)
+            session.messages.append({"role": "assistant", "content": response.content})
+            return response.content
 
-        response = self.client.messages.create(
-            model=model,
-            messages=self.context_cache[session_id],
-            tools=tools or [],
-            max_tokens=1000
-        )
+    def submit(self, session_id, message, **kwargs):
+        return self._executor.submit(self.send_message_with_context, session_id, message, **kwargs)
 
-        self.context_cache[session_id].append({"role": "assistant", "content": response.content})
-        return response.content
+    def send_many(self, requests):
+        """Run independent ``(session_id, message, kwargs)`` prompts concurrently; results in order."""
+        futures = [self.submit(session_id, message, **kwargs) for session_id, message, kwargs in requests]
+        return [future.result() for future in futures]
 
     def clear_context(self, session_id):
-        if session_id in self.context_cache:
-            del self.context_cache[session_id]
\ No newline at end of file
+        with self._lock:
+            self.context_cache.pop(session_id, None)
@@ -0,0 +1,61 @@
+import functools
+import os
+from contextlib import contextmanager
+from time import perf_counter
+from flask import Response
+
+try:
+    from prometheus_client import (CollectorRegistry, Histogram, REGISTRY, generate_latest, multiprocess,
+                                   start_http_server, CONTENT_TYPE_LATEST)
+except ImportError:  # Optional: timing hooks become no-ops without it
+    Histogram = None
+
+STAGE_SECONDS = Histogram(
+    'msa_stage_seconds', 'Latency of surveillance pipeline stages', ['stage'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+) if Histogram is not None else None
+
+
+@contextmanager
+def timed(stage):
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        if STAGE_SECONDS is not None:
+            STAGE_SECONDS.labels(stage).observe(perf_counter() - started)
+
+
+def instrument(stage):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def collector_registry():
+    # With PROMETHEUS_MULTIPROC_DIR set, every process writes its samples to shared
+    # files and exposition merges them, so forked workers all show up
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def start_metrics_server(port):
+    start_http_server(port, registry=collector_registry())
+
+
+def mark_process_dead(pid):
+    if Histogram is not None and os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
+
+
+def metrics_view():
+    if Histogram is None:
+        return Response('prometheus_client is not installed\n', status=501, mimetype='text/plain')
+    return Response(generate_latest(collector_registry()), mimetype=CONTENT_TYPE_LATEST)
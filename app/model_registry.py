@@ -0,0 +1,75 @@
+import gc
+import logging
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:  # Optional: falls back to the peak RSS from getrusage
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+
+def _rss_bytes():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ModelRegistry:
+    """Loads heavy models on first use and remembers what each one cost.
+
+    Loaders are plain callables registered by name; nothing is imported or built
+    until ``get`` is called. ``preload`` builds a set of models up front, which in a
+    Celery prefork parent means the weights are shared copy-on-write with every
+    forked worker. The eventlet web worker is a single process and is not preloaded
+    by gunicorn: importing the app before eventlet patches would leave the
+    registry's locks as real OS locks.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._stats = {}
+        self._locks = {}
+
+    def register(self, name, loader):
+        self._loaders[name] = loader
+        self._locks[name] = threading.Lock()
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._locks[name]:
+            if name not in self._models:
+                rss_before = _rss_bytes()
+                started = time.perf_counter()
+                self._models[name] = self._loaders[name]()
+                self._stats[name] = {
+                    'load_seconds': time.perf_counter() - started,
+                    'rss_delta_bytes': _rss_bytes() - rss_before,
+                }
+                logger.info("Loaded model %s in %.2fs (+%.0f MB RSS)", name, self._stats[name]['load_seconds'],
+                            self._stats[name]['rss_delta_bytes'] / 2 ** 20)
+        return self._models[name]
+
+    def unload(self, name):
+        """Forget a loaded model so the next ``get`` builds it again."""
+        with self._locks[name]:
+            self._models.pop(name, None)
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def preload(self, names=None):
+        for name in names or self._loaders:
+            self.get(name)
+        # Keep the loaded objects out of future GC passes so forked children
+        # do not dirty (and copy) the pages that hold them
+        gc.freeze()
+
+    def stats(self):
+        return {name: dict(self._stats.get(name, {}), loaded=name in self._models) for name in self._loaders}
@@ -1,21 +1,64 @@
+from app.config import Config
 from app.extensions import db
 
+try:
+    from geoalchemy2 import Geometry
+except ImportError:  # PostGIS columns are optional
+    Geometry = None
+
+POSTGIS_ENABLED = bool(Config.TRACKS_POSTGIS and Geometry is not None)
+
 class Vessel(db.Model):
     id = db.Column(db.String(50), primary_key=True)
     lat = db.Column(db.Float)
     lon = db.Column(db.Float)
     speed = db.Column(db.Float)
     heading = db.Column(db.Float)
-    timestamp = db.Column(db.Float)
+    timestamp = db.Column(db.Float, index=True)
     trajectory = db.Column(db.Text)
-    is_friendly = db.Column(db.Integer)
+    is_friendly = db.Column(db.Integer, index=True)
+    updated_at = db.Column(db.Float, index=True)  # bumped on every write; backs REST cache validators
+
+    __table_args__ = (db.Index('ix_vessel_lat_lon', 'lat', 'lon'),)
+
+class TableChange(db.Model):
+    # Deletes leave no row to carry an updated_at, so they are stamped per table here
+    table = db.Column(db.String(50), primary_key=True)
+    deleted_at = db.Column(db.Float)
+
+class TrackPoint(db.Model):
+    # Position history, range-partitioned by day on Postgres (see app.history)
+    vessel_id = db.Column(db.String(50), primary_key=True)
+    timestamp = db.Column(db.Float, primary_key=True)
+    lat = db.Column(db.Float)
+    lon = db.Column(db.Float)
+    speed = db.Column(db.Float)
+    heading = db.Column(db.Float)
+    if POSTGIS_ENABLED:
+        geom = db.Column(Geometry('POINT', srid=4326, spatial_index=True))
+
+    __table_args__ = (
+        db.Index('ix_track_point_time_lat_lon', 'timestamp', 'lat', 'lon'),
+        {'postgresql_partition_by': 'RANGE (timestamp)'},
+    )
+
+@db.event.listens_for(TrackPoint.__table__, 'after_create')
+def _create_track_partitions(target, connection, **kw):
+    # Daily partitions exist before the first report arrives, so the default partition stays empty
+    if connection.dialect.name == 'postgresql':
+        from app.history import ensure_partitions
+        connection.execute(db.text('CREATE TABLE IF NOT EXISTS track_point_default PARTITION OF track_point DEFAULT'))
+        ensure_partitions(connection, Config.TRACK_PARTITION_DAYS_AHEAD)
 
 class Alert(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    vessel_id = db.Column(db.String(50))
+    vessel_id = db.Column(db.String(50), index=True)
     type = db.Column(db.String(50))
+    state = db.Column(db.String(10))  # raised, cleared
     message = db.Column(db.Text)
-    timestamp = db.Column(db.Float)
+    timestamp = db.Column(db.Float, index=True)
+
+    __table_args__ = (db.Index('ix_alert_vessel_timestamp', 'vessel_id', 'timestamp'),)
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
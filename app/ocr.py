@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _prepare(image_bytes, max_side, large_image):
+    """Decode to grayscale and split or shrink oversized images; returns a list of arrays."""
+    import cv2
+    gray = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise ValueError("Unreadable image")
+    height, width = gray.shape
+    if max(height, width) <= max_side:
+        return [gray]
+    if large_image == 'downscale':
+        scale = max_side / max(height, width)
+        return [cv2.resize(gray, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)]
+    # Overlapping tiles keep text on tile edges readable without shrinking it
+    overlap = max_side // 16
+    step = max_side - overlap
+    return [gray[y:y + max_side, x:x + max_side]
+            for y in range(0, max(height - overlap, 1), step)
+            for x in range(0, max(width - overlap, 1), step)]
+
+
+def _ocr_bytes(image_bytes, max_side, large_image):
+    from app.utils import models
+    reader = models.get('ocr_reader')
+    texts = []
+    for tile in _prepare(image_bytes, max_side, large_image):
+        texts.extend(detection[1] for detection in reader.readtext(tile))
+    return ' '.join(texts)
+
+
+def _ocr_one(image_bytes, max_side, large_image):
+    # One bad image yields an error for itself instead of failing its batch
+    try:
+        return _ocr_bytes(image_bytes, max_side, large_image), None
+    except Exception as exc:
+        return None, f"{type(exc).__name__}: {exc}"
+
+
+def _ocr_batch(batch, max_side, large_image):
+    return [_ocr_one(image_bytes, max_side, large_image) for image_bytes in batch]
+
+
+class OCRService:
+    """Batched OCR with a content-hash cache.
+
+    Images (paths or raw bytes) are hashed first; cached results come back without
+    decoding anything. The rest are split across a process pool, each process
+    holding its own EasyOCR reader, or run inline when ``workers`` is 0.
+    """
+
+    def __init__(self, workers=2, max_side=2048, large_image='tile', cache_dir=None, memory_cache_size=1024):
+        self.workers = workers
+        self.max_side = max_side
+        self.large_image = large_image
+        self.cache_dir = cache_dir
+        self.memory_cache_size = memory_cache_size
+        self._memory = OrderedDict()
+        self._pool = None
+
+    def init_app(self, app):
+        self.workers = app.config['OCR_WORKERS']
+        self.max_side = app.config['OCR_MAX_SIDE']
+        self.large_image = app.config['OCR_LARGE_IMAGE']
+        self.cache_dir = app.config['OCR_CACHE_DIR']
+        self._memory.clear()
+
+    def _executor(self):
+        if self._pool is None:
+            # Spawned rather than forked: the parent may hold torch threads or an event loop
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def _key(self, image_bytes):
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        return f"{digest}-{self.large_image}-{self.max_side}"
+
+    def _cache_get(self, key):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        if self.cache_dir:
+            try:
+                with open(os.path.join(self.cache_dir, key + '.json')) as f:
+                    text = json.load(f)
+            except (FileNotFoundError, ValueError):
+                return None
+            self._remember(key, text)
+            return text
+        return None
+
+    def _cache_put(self, key, text):
+        self._remember(key, text)
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = os.path.join(self.cache_dir, key + '.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(text, f)
+            os.replace(tmp_path, os.path.join(self.cache_dir, key + '.json'))
+
+    def _remember(self, key, text):
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_cache_size:
+            self._memory.popitem(last=False)
+
+    def read_batch(self, images):
+        """OCR a list of image paths or bytes; returns texts in input order ('' if unreadable)."""
+        texts, errors = self.read_batch_with_errors(images)
+        for image, error in zip(images, errors):
+            if error:
+                logger.warning("OCR failed for %s: %s", image if isinstance(image, str) else 'image bytes', error)
+        return [text if text is not None else '' for text in texts]
+
+    def read_batch_with_errors(self, images):
+        """Like ``read_batch`` but returns ``(texts, errors)``; a failed image has text None."""
+        blobs, errors = [], [None] * len(images)
+        for i, image in enumerate(images):
+            if isinstance(image, (bytes, bytearray)):
+                blobs.append(bytes(image))
+                continue
+            try:
+                with open(image, 'rb') as f:
+                    blobs.append(f.read())
+            except OSError as exc:
+                blobs.append(None)
+                errors[i] = f"{type(exc).__name__}: {exc}"
+        keys = [self._key(blob) if blob is not None else None for blob in blobs]
+        results = [self._cache_get(key) if key is not None else None for key in keys]
+
+        pending = {}
+        for i, (key, result) in enumerate(zip(keys, results)):
+            if key is not None and result is None:
+                pending.setdefault(key, (i, blobs[i]))  # identical images in one batch are read once
+        if pending:
+            todo = list(pending.values())
+            if self.workers:
+                chunks = [chunk for chunk in (todo[i::self.workers] for i in range(self.workers)) if chunk]
+                futures = [self._executor().submit(_ocr_batch, [blob for _, blob in chunk], self.max_side, self.large_image)
+                           for chunk in chunks]
+                outcomes = {}
+                for chunk, future in zip(chunks, futures):
+                    for (i, _), outcome in zip(chunk, future.result()):
+                        outcomes[keys[i]] = outcome
+            else:
+                outcomes = {keys[i]: _ocr_one(blob, self.max_side, self.large_image) for i, blob in todo}
+            for key, (text, error) in outcomes.items():
+                if error is None:
+                    self._cache_put(key, text)
+            for i, key in enumerate(keys):
+                if key in outcomes:
+                    results[i], error = outcomes[key]
+                    errors[i] = errors[i] or error
+        return results, errors
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_NM = 3440.065
+NM_PER_DEG_LAT = 60.0
+
+
+def _unit_vectors(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+class ProximityEngine:
+    """Fleet-wide closest point of approach (CPA/TCPA) under constant course and speed.
+
+    Candidate pairs come from a KD-tree over positions on the unit sphere: only
+    vessels that could close to ``cpa_threshold_nm`` within ``horizon_minutes`` at
+    ``max_speed_kn`` are paired, so the cost follows local density rather than N^2.
+    CPA and TCPA are then solved for all candidate pairs at once.
+    """
+
+    def __init__(self, cpa_threshold_nm=1.0, horizon_minutes=30, max_speed_kn=30.0):
+        self.cpa_threshold_nm = cpa_threshold_nm
+        self.horizon_minutes = horizon_minutes
+        self.max_speed_kn = max_speed_kn
+
+    def init_app(self, app):
+        self.cpa_threshold_nm = app.config['PROXIMITY_CPA_NM']
+        self.horizon_minutes = app.config['PROXIMITY_HORIZON_MINUTES']
+        self.max_speed_kn = app.config['PROXIMITY_MAX_SPEED_KN']
+
+    @property
+    def search_radius_nm(self):
+        return self.cpa_threshold_nm + 2 * self.max_speed_kn * self.horizon_minutes / 60
+
+    def candidate_pairs(self, lat, lon):
+        if len(lat) < 2:
+            return np.empty((0, 2), dtype=int)
+        angle = min(self.search_radius_nm / EARTH_RADIUS_NM, np.pi)
+        chord = 2 * np.sin(angle / 2)
+        return cKDTree(_unit_vectors(lat, lon)).query_pairs(chord, output_type='ndarray')
+
+    def assess(self, ids, lat, lon, speed, heading):
+        """Return a DataFrame of pairs whose CPA falls under the threshold within the horizon."""
+        ids = np.asarray(ids)
+        lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+        speed, heading = np.asarray(speed, dtype=float), np.asarray(heading, dtype=float)
+        # Without both a speed and a course there is no velocity to project; treat as stationary
+        unknown = np.isnan(speed) | np.isnan(heading)
+        speed = np.where(unknown, 0.0, speed)
+        heading = np.radians(np.where(unknown, 0.0, heading))
+        pairs = self.candidate_pairs(lat, lon)
+        a, b = pairs[:, 0], pairs[:, 1]
+
+        # Relative geometry in a local east/north plane (nm, knots) centred on each pair
+        mid_lat = np.radians((lat[a] + lat[b]) / 2)
+        d_lon = (lon[b] - lon[a] + 180) % 360 - 180
+        dx = d_lon * NM_PER_DEG_LAT * np.cos(mid_lat)
+        dy = (lat[b] - lat[a]) * NM_PER_DEG_LAT
+        vx = speed[b] * np.sin(heading[b]) - speed[a] * np.sin(heading[a])
+        vy = speed[b] * np.cos(heading[b]) - speed[a] * np.cos(heading[a])
+
+        v2 = vx ** 2 + vy ** 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tcpa_h = np.where(v2 > 1e-9, -(dx * vx + dy * vy) / v2, 0.0)
+        tcpa_h = np.clip(tcpa_h, 0.0, self.horizon_minutes / 60)
+        cpa = np.hypot(dx + vx * tcpa_h, dy + vy * tcpa_h)
+
+        close = cpa <= self.cpa_threshold_nm
+        return pd.DataFrame({
+            'vessel_a': ids[a][close],
+            'vessel_b': ids[b][close],
+            'range_nm': np.hypot(dx, dy)[close],
+            'cpa_nm': cpa[close],
+            'tcpa_min': tcpa_h[close] * 60,
+        })
+
+    def assess_frame(self, df):
+        return self.assess(df['vessel_id'], df['lat'], df['lon'], df['speed'], df['heading'])
+
+    def assess_against(self, batch, fleet):
+        """Pairs involving at least one ``batch`` contact, with ``fleet`` standing in for
+        everyone else. Batch rows supersede fleet rows for the same vessel."""
+        columns = ['vessel_id', 'lat', 'lon', 'speed', 'heading']
+        others = fleet.loc[~fleet['vessel_id'].isin(batch['vessel_id']), columns]
+        combined = pd.concat([batch[columns], others], ignore_index=True).dropna(subset=['lat', 'lon'])
+        pairs = self.assess_frame(combined)
+        ids = set(batch['vessel_id'])
+        return pairs[pairs['vessel_a'].isin(ids) | pairs['vessel_b'].isin(ids)]
+
+    @staticmethod
+    def min_cpa_per_vessel(pairs, ids):
+        """Smallest CPA each vessel has with any other (NaN when it has no close pair)."""
+        both = pd.concat([
+            pairs[['vessel_a', 'cpa_nm']].rename(columns={'vessel_a': 'vessel_id'}),
+            pairs[['vessel_b', 'cpa_nm']].rename(columns={'vessel_b': 'vessel_id'}),
+        ])
+        return both.groupby('vessel_id')['cpa_nm'].min().reindex(ids)
+
+    @staticmethod
+    def alerts(pairs, only_ids=None):
+        if only_ids is not None:
+            only_ids = set(only_ids)
+            pairs = pairs[pairs['vessel_a'].isin(only_ids) | pairs['vessel_b'].isin(only_ids)]
+        # Pair order from the KD-tree can flip between ticks; report each pair in id order
+        swap = (pairs['vessel_a'].astype(str) > pairs['vessel_b'].astype(str)).to_numpy()
+        pairs = pairs.assign(vessel_a=pairs['vessel_a'].where(~swap, pairs['vessel_b']),
+                             vessel_b=pairs['vessel_b'].where(~swap, pairs['vessel_a']))
+        return [{
+            'vessel_id': row.vessel_a,
+            'other_vessel_id': row.vessel_b,
+            'type': 'cpa',
+            'cpa_nm': round(float(row.cpa_nm), 3),
+            'tcpa_min': round(float(row.tcpa_min), 1),
+            'message': f"Vessels {row.vessel_a} and {row.vessel_b} close to {row.cpa_nm:.2f} nm in {row.tcpa_min:.0f} min",
+        } for row in pairs.itertuples(index=False)]
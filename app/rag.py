@@ -0,0 +1,150 @@
+import hashlib
+import logging
+import threading
+import redis
+from app.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'rag:index_version'
+
+
+class CachedQueryEmbeddings:
+    """Wraps a LangChain embeddings object and memoizes ``embed_query``."""
+
+    def __init__(self, embeddings, maxsize=4096):
+        self.embeddings = embeddings
+        self._cache = TTLCache(maxsize)
+
+    def embed_query(self, text):
+        vector = self._cache.get(text)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self._cache.put(text, vector)
+        return vector
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+
+def chunk_id(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _normalize(query):
+    return ' '.join(query.lower().split())
+
+
+class RAGService:
+    """Persistent document index plus a reusable, cached question-answering chain.
+
+    The retriever and chain are built once per process. Answers are cached per
+    normalized query for ``answer_ttl`` seconds, and query embeddings are memoized
+    by the embeddings wrapper, so repeated agent questions skip both the embedding
+    model and the LLM.
+
+    Ingestion usually runs in another process, so every ingest that adds chunks
+    bumps a shared Redis counter (``VERSION_KEY``). ``query`` compares it with the
+    version this process last saw; on a change it drops cached answers and reopens
+    the vectorstore so the new chunks are searchable.
+    """
+
+    def __init__(self, models, api_key=None, model="claude-3-sonnet-20240229", k=4, embed_batch_size=64,
+                 answer_ttl=600, answer_cache_size=512, persist_dir=None, redis_client=None):
+        self.models = models
+        self.api_key = api_key
+        self.persist_dir = persist_dir
+        self.model = model
+        self.k = k
+        self.embed_batch_size = embed_batch_size
+        self.answers = TTLCache(answer_cache_size, answer_ttl)
+        self.redis_client = redis_client or (lambda: None)
+        self._version = None
+        self._chain = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        with self._lock:
+            self.api_key = app.config['ANTHROPIC_API_KEY']
+            self.persist_dir = app.config['RAG_PERSIST_DIR']
+            self.embed_batch_size = app.config['RAG_EMBED_BATCH_SIZE']
+            self.answers.ttl = app.config['RAG_ANSWER_TTL']
+            self.answers.clear()
+            self._chain = None
+            self.models.unload('vectorstore')
+
+    @property
+    def vectorstore(self):
+        return self.models.get('vectorstore')
+
+    def _qa_chain(self):
+        if self._chain is None:
+            with self._lock:
+                if self._chain is None:
+                    from langchain.chains import RetrievalQA
+                    from langchain_anthropic import ChatAnthropic
+                    llm = ChatAnthropic(model=self.model, api_key=self.api_key)
+                    retriever = self.vectorstore.as_retriever(search_kwargs={'k': self.k})
+                    self._chain = RetrievalQA.from_chain_type(llm=llm, chain_type="stuff", retriever=retriever)
+        return self._chain
+
+    def _index_version(self):
+        client = self.redis_client()
+        if client is None:
+            return None
+        try:
+            version = client.get(VERSION_KEY)
+        except redis.RedisError:
+            logger.warning("Could not read the RAG index version; serving the local index", exc_info=True)
+            return self._version
+        return int(version) if version is not None else None  # redis returns bytes; incr returns int
+
+    def _sync_index(self):
+        version = self._index_version()
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self.answers.clear()
+                self._chain = None
+                self.models.unload('vectorstore')
+                self._version = version
+
+    def _bump_version(self):
+        client = self.redis_client()
+        if client is None:
+            return
+        try:
+            self._version = client.incr(VERSION_KEY)
+        except redis.RedisError:
+            logger.warning("Could not publish the RAG index version", exc_info=True)
+
+    def query(self, query):
+        self._sync_index()
+        key = _normalize(query)
+        answer = self.answers.get(key)
+        if answer is None:
+            answer = self._qa_chain().invoke({'query': query})['result']
+            self.answers.put(key, answer)
+        return answer
+
+    def ingest(self, file_path):
+        """Split a PDF and add chunks not already indexed, embedding them in batches."""
+        from langchain_community.document_loaders import PyPDFLoader
+        docs = PyPDFLoader(file_path).load_and_split()
+        unique = {}
+        for doc in docs:
+            unique.setdefault(chunk_id(doc.page_content), doc)
+        ids = list(unique)
+        existing = set()
+        for start in range(0, len(ids), 1000):
+            existing.update(self.vectorstore.get(ids=ids[start:start + 1000], include=[])['ids'])
+        new_ids = [i for i in ids if i not in existing]
+        for start in range(0, len(new_ids), self.embed_batch_size):
+            batch = new_ids[start:start + self.embed_batch_size]
+            self.vectorstore.add_texts([unique[i].page_content for i in batch],
+                                       metadatas=[unique[i].metadata for i in batch], ids=batch)
+        if new_ids:
+            self.answers.clear()
+            self._bump_version()
+        return {'chunks': len(docs), 'added': len(new_ids), 'duplicates': len(docs) - len(new_ids)}
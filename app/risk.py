@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.strtree import STRtree
+
+
+class RiskEngine:
+    """Columnar risk scoring with per-factor contributions.
+
+    Zones are axis-aligned boxes ``{'name', 'lat_min', 'lat_max', 'lon_min', 'lon_max', 'weight'}``
+    held in an STRtree, so a batch of positions is matched to zones in one query.
+    """
+
+    FACTORS = ['risk_speed', 'risk_zone', 'risk_anomaly', 'risk_proximity']
+
+    def __init__(self, zones=(), speed_threshold=12, speed_weight=40, anomaly_weight=30,
+                 cpa_threshold_nm=1.0, proximity_weight=30):
+        self.zones = list(zones)
+        self.speed_threshold = speed_threshold
+        self.speed_weight = speed_weight
+        self.anomaly_weight = anomaly_weight
+        self.cpa_threshold_nm = cpa_threshold_nm
+        self.proximity_weight = proximity_weight
+        self._index_zones()
+
+    def init_app(self, app):
+        self.zones = list(app.config['RISK_ZONES'])
+        self.cpa_threshold_nm = app.config['PROXIMITY_CPA_NM']
+        self._index_zones()
+
+    def _index_zones(self):
+        self._weights = np.array([zone.get('weight', 30) for zone in self.zones], dtype=float)
+        boxes = [shapely.box(z['lat_min'], z['lon_min'], z['lat_max'], z['lon_max']) for z in self.zones]
+        self._tree = STRtree(boxes) if boxes else None
+
+    def zone_weights(self, lat, lon):
+        """Highest weight of any zone containing each position (0 outside all zones)."""
+        lat = np.asarray(lat, dtype=float)
+        result = np.zeros(len(lat))
+        if self._tree is None or not len(lat):
+            return result
+        point_idx, zone_idx = self._tree.query(shapely.points(lat, np.asarray(lon, dtype=float)), predicate='intersects')
+        np.maximum.at(result, point_idx, self._weights[zone_idx])
+        return result
+
+    def contributions(self, lat, lon, speed, anomaly=None, min_cpa_nm=None):
+        speed = np.nan_to_num(np.asarray(speed, dtype=float))
+        factors = {
+            'risk_speed': np.where(speed > self.speed_threshold, self.speed_weight, 0.0),
+            'risk_zone': self.zone_weights(lat, lon),
+            'risk_anomaly': np.zeros(len(speed)),
+            'risk_proximity': np.zeros(len(speed)),
+        }
+        if anomaly is not None:
+            factors['risk_anomaly'] = np.where(np.asarray(anomaly) == -1, self.anomaly_weight, 0.0)
+        if min_cpa_nm is not None:
+            # Full weight at zero CPA, tapering to nothing at the threshold
+            cpa = np.asarray(min_cpa_nm, dtype=float)
+            closeness = np.clip(1 - cpa / self.cpa_threshold_nm, 0, 1)
+            factors['risk_proximity'] = np.nan_to_num(closeness) * self.proximity_weight
+        factors['risk_score'] = np.minimum(sum(factors[name] for name in self.FACTORS), 100)
+        return factors
+
+    def score_frame(self, df):
+        """Return a DataFrame of per-factor contributions and the total ``risk_score``."""
+        anomaly = df['anomaly'] if 'anomaly' in df else None
+        min_cpa_nm = df['min_cpa_nm'] if 'min_cpa_nm' in df else None
+        factors = self.contributions(df['lat'], df['lon'], df['speed'], anomaly, min_cpa_nm)
+        return pd.DataFrame(factors, index=df.index)
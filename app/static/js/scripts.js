@@ -11,11 +11,22 @@ function playBeep() {
     audio.play();
 }
 
-// Example map update
-socket.on('data_update', (data) => {
+// Fleet state: full snapshot on connect, then deltas at the server tick rate
+// (with DASHBOARD_ENCODING = 'msgpack' payloads arrive as binary and need decoding first)
+const vessels = {};
+
+socket.on('data_snapshot', (data) => {
+    Object.keys(vessels).forEach((id) => delete vessels[id]);
+    data.vessels.forEach((v) => { vessels[v.vessel_id] = v; });
+    // Redraw Leaflet markers
+});
+
+socket.on('data_delta', (data) => {
+    data.added.concat(data.updated).forEach((v) => { vessels[v.vessel_id] = v; });
+    data.removed.forEach((id) => delete vessels[id]);
     // Update Leaflet markers
     // Play beep if new alerts
-    if (data.alerts.length > 0) {
+    if (data.alerts && data.alerts.length > 0) {
         playBeep();
     }
 });
@@ -0,0 +1,96 @@
+import time
+import pandas as pd
+from celery import shared_task
+from flask import current_app
+from app.extensions import db, socketio
+from app.history import manage_partitions
+from app.models import Vessel, TrackPoint
+from app.workflow import PENDING_KEY, SCHEDULED_KEY, contact_image_path, drain_pending, set_job_status
+
+
+@shared_task(ignore_result=True)
+def train_anomaly_model(contamination=0.1):
+    from app.utils import ANOMALY_TRAIN_KEY, anomaly_model
+    # Prefer the recent position history; fall back to the latest-position table
+    since = time.time() - current_app.config['ANOMALY_TRAIN_DAYS'] * 86400
+    df = pd.read_sql(db.select(TrackPoint.speed, TrackPoint.heading).where(TrackPoint.timestamp >= since), db.engine)
+    if df.empty:
+        df = pd.read_sql(db.select(Vessel.speed, Vessel.heading), db.engine)
+    if df.empty:
+        return None
+    version = anomaly_model.train(df, contamination=contamination)
+    current_app.redis.delete(ANOMALY_TRAIN_KEY)  # later drift may queue the next run right away
+    return version
+
+
+@shared_task(ignore_result=True)
+def manage_track_partitions():
+    return manage_partitions(current_app.config['TRACK_RETENTION_DAYS'],
+                             current_app.config['TRACK_PARTITION_DAYS_AHEAD'])
+
+
+@shared_task
+def ocr_batch(image_paths):
+    """OCR images ahead of the workflow so the detection pass finds them in the cache."""
+    from app.utils import ocr_service
+    return ocr_service.read_batch(image_paths)
+
+
+@shared_task
+def ingest_rag_document(file_path):
+    from app.utils import rag
+    return rag.ingest(file_path)
+
+
+def _runnable(items):
+    """Resolve image ids to stored files; a contact whose image is gone fails on its own."""
+    runnable, image_paths = [], []
+    for item in items:
+        if item.get('image_id'):
+            path = contact_image_path(item['image_id'])
+            if path is None:
+                set_job_status(item['job_id'], 'failed', error=f"Image {item['image_id']} not found")
+                continue
+            image_paths.append(path)
+        runnable.append(item)
+    return runnable, image_paths
+
+
+def _run_workflow(items, image_paths):
+    from app.agents.orchestrator import orchestrate_workflow
+    job_ids = [item['job_id'] for item in items]
+    for job_id in job_ids:
+        set_job_status(job_id, 'running')
+    input_data = {'vessel_df': pd.DataFrame([item['vessel'] for item in items])}
+    if image_paths:
+        input_data['image_paths'] = image_paths
+    try:
+        result = orchestrate_workflow(current_app.mcp, input_data)
+    except Exception as exc:
+        for job_id in job_ids:
+            set_job_status(job_id, 'failed', error=str(exc))
+        raise
+    plan = current_app.mcp.text(result.get('response_plan', ''))
+    for job_id in job_ids:
+        set_job_status(job_id, 'done', incident_id=result['incident_id'], response_plan=plan)
+    socketio.emit('workflow_result', {
+        'job_ids': job_ids,
+        'vessel_ids': [item['vessel']['vessel_id'] for item in items],
+        'response_plan': plan,
+    }, namespace='/dashboard')
+
+
+@shared_task(ignore_result=True)
+def run_workflow_batch():
+    items = drain_pending(current_app.config['WORKFLOW_BATCH_MAX'])
+    if not items:
+        return
+    try:
+        items, image_paths = _runnable(items)
+        if items:
+            _run_workflow(items, image_paths)
+    finally:
+        # Contacts that arrived while this batch ran start the next window
+        if current_app.redis.llen(PENDING_KEY):
+            if current_app.redis.set(SCHEDULED_KEY, 'next', nx=True, ex=60):
+                run_workflow_batch.apply_async(countdown=current_app.config['WORKFLOW_BATCH_WINDOW'])
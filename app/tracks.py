@@ -0,0 +1,129 @@
+import math
+import threading
+from collections import defaultdict
+
+EARTH_RADIUS_NM = 3440.065
+
+
+def _wrap_lon(lon):
+    return (lon + 180.0) % 360.0 - 180.0
+
+
+class TrackStore:
+    """Latest position per contact, held in memory behind a uniform lat/lon grid.
+
+    Lookups by bounding box or by range visit only the grid cells that overlap the
+    query, so sweep cost follows the number of nearby contacts, not the fleet size.
+    Longitudes are wrapped to [-180, 180), so boxes may cross the antimeridian.
+    """
+
+    def __init__(self, cell_deg=1.0):
+        self.cell_deg = cell_deg
+        self._tracks = {}
+        self._cells = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tracks)
+
+    def _cell(self, lat, lon):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(_wrap_lon(lon) / self.cell_deg))
+
+    def upsert(self, vessel_id, **fields):
+        with self._lock:
+            self._upsert(vessel_id, fields)
+
+    def upsert_many(self, records):
+        with self._lock:
+            for record in records:
+                record = dict(record)
+                self._upsert(record.pop('vessel_id'), record)
+
+    def _upsert(self, vessel_id, fields):
+        track = self._tracks.get(vessel_id)
+        if track is not None:
+            self._unplace(vessel_id, track)
+            track.update(fields)
+        else:
+            track = self._tracks[vessel_id] = dict(fields, vessel_id=vessel_id)
+        if track.get('lat') is None or track.get('lon') is None:
+            return
+        self._cells[self._cell(track['lat'], track['lon'])].add(vessel_id)
+
+    def remove(self, vessel_ids):
+        with self._lock:
+            for vessel_id in vessel_ids:
+                track = self._tracks.pop(vessel_id, None)
+                if track is not None:
+                    self._unplace(vessel_id, track)
+
+    def _unplace(self, vessel_id, track):
+        # Contacts without a position are tracked but sit in no cell
+        if track.get('lat') is None or track.get('lon') is None:
+            return
+        cell = self._cell(track['lat'], track['lon'])
+        self._cells[cell].discard(vessel_id)
+        if not self._cells[cell]:
+            del self._cells[cell]
+
+    def get(self, vessel_id):
+        track = self._tracks.get(vessel_id)
+        return dict(track) if track else None
+
+    def query_bbox(self, lat_min, lon_min, lat_max, lon_max):
+        """Contacts inside the box; ``lon_min`` east of ``lon_max`` means it crosses the antimeridian."""
+        lat_min, lat_max = max(lat_min, -90.0), min(lat_max, 90.0)
+        if lat_min > lat_max:
+            return []
+        if lon_max - lon_min >= 360:
+            spans = [(-180.0, 180.0)]
+        else:
+            lon_min, lon_max = _wrap_lon(lon_min), _wrap_lon(lon_max)
+            spans = [(lon_min, lon_max)] if lon_min <= lon_max else [(lon_min, 180.0), (-180.0, lon_max)]
+        result = []
+        with self._lock:
+            for west, east in spans:
+                for vessel_id in self._ids_in_cells(lat_min, west, lat_max, east):
+                    track = self._tracks[vessel_id]
+                    if lat_min <= track['lat'] <= lat_max and west <= _wrap_lon(track['lon']) <= east:
+                        result.append(dict(track))
+        return result
+
+    def _ids_in_cells(self, lat_min, lon_min, lat_max, lon_max):
+        (row_min, col_min), (row_max, col_max) = self._cell(lat_min, lon_min), self._cell(lat_max, lon_max)
+        if lon_max >= 180.0:  # _cell wraps 180 to -180
+            col_max = int(math.floor(180.0 / self.cell_deg))
+        if (row_max - row_min + 1) * (col_max - col_min + 1) > len(self._cells):
+            # Wide boxes: cheaper to walk the occupied cells than every cell in range
+            for (row, col), ids in self._cells.items():
+                if row_min <= row <= row_max and col_min <= col <= col_max:
+                    yield from ids
+            return
+        for row in range(row_min, row_max + 1):
+            for col in range(col_min, col_max + 1):
+                yield from self._cells.get((row, col), ())
+
+    def query_range(self, lat, lon, range_nm):
+        """Contacts within ``range_nm`` of (lat, lon), annotated with range and bearing."""
+        d_lat = math.degrees(range_nm / EARTH_RADIUS_NM)
+        # Widen by the poleward edge of the circle; past a pole every longitude is in range
+        edge = abs(lat) + d_lat
+        d_lon = 180.0 if edge >= 90 else min(d_lat / math.cos(math.radians(edge)), 180.0)
+        sin_lat1, cos_lat1 = math.sin(math.radians(lat)), math.cos(math.radians(lat))
+        result = []
+        for track in self.query_bbox(lat - d_lat, lon - d_lon, lat + d_lat, lon + d_lon):
+            # Haversine, so ranges stay right near the poles and across the antimeridian
+            lat2, d_lon_rad = math.radians(track['lat']), math.radians(track['lon'] - lon)
+            a = (math.sin(math.radians(track['lat'] - lat) / 2) ** 2
+                 + cos_lat1 * math.cos(lat2) * math.sin(d_lon_rad / 2) ** 2)
+            distance = 2 * EARTH_RADIUS_NM * math.asin(min(math.sqrt(a), 1.0))
+            if distance <= range_nm:
+                track['range_nm'] = distance
+                track['bearing'] = math.degrees(math.atan2(
+                    math.sin(d_lon_rad) * math.cos(lat2),
+                    cos_lat1 * math.sin(lat2) - sin_lat1 * math.cos(lat2) * math.cos(d_lon_rad))) % 360
+                result.append(track)
+        return result
+
+
+track_store = TrackStore()
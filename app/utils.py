@@ -1,81 +1,225 @@
 import numpy as np
-import json
+import pandas as pd
 from sklearn.ensemble import IsolationForest
-from shapely.geometry import LineString, MultiLineString
-from datetime import datetime
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.chains import RetrievalQA
-import easyocr
-import cv2
+from functools import lru_cache
+from app.boundaries import BoundaryRegistry
+from app.anomaly import AnomalyModelManager
+from app.risk import RiskEngine
+from app.proximity import ProximityEngine
+from app.alerts import AlertEngine
+from app.model_registry import ModelRegistry
+from app.ocr import OCRService
+from app.rag import RAGService, CachedQueryEmbeddings
 
 
 # Trajectory prediction
+EARTH_RADIUS_KM = 6371.0088
+KNOTS_TO_KM_PER_MIN = 1.852 / 60
+
+def predict_trajectory_batch(lat, lon, speed, heading, time_minutes, steps=10, method='rhumb'):
+    """Predict N constant-course tracks at once; returns an (N, steps + 1, 2) array of [lat, lon].
+
+    ``method='rhumb'`` follows the constant-heading loxodrome, ``'great_circle'`` the
+    geodesic with ``heading`` as initial bearing. Every step is evaluated in closed form,
+    so there is no per-vessel or per-step Python loop.
+    """
+    lat = np.radians(np.atleast_1d(np.asarray(lat, dtype=float)))[:, None]
+    lon = np.radians(np.atleast_1d(np.asarray(lon, dtype=float)))[:, None]
+    heading = np.radians(np.atleast_1d(np.asarray(heading, dtype=float)))[:, None]
+    speed = np.atleast_1d(np.asarray(speed, dtype=float))[:, None]
+    time_minutes = np.atleast_1d(np.asarray(time_minutes, dtype=float))[:, None]
+
+    # Angular distance travelled after each step, shape (N, steps + 1)
+    delta = speed * KNOTS_TO_KM_PER_MIN * time_minutes * np.linspace(0.0, 1.0, steps + 1) / EARTH_RADIUS_KM
+    sin_h, cos_h = np.sin(heading), np.cos(heading)
+
+    if method == 'rhumb':
+        lat2 = np.clip(lat + delta * cos_h, -np.pi / 2, np.pi / 2)
+        with np.errstate(divide='ignore', invalid='ignore'):  # Mercator latitude is infinite at the poles
+            d_psi = np.log(np.tan(np.pi / 4 + lat2 / 2) / np.tan(np.pi / 4 + lat / 2))
+            q = np.where(np.abs(d_psi) > 1e-12, (lat2 - lat) / d_psi, np.cos(lat))
+            d_lon = np.where(np.abs(q) > 1e-12, delta * sin_h / q, 0.0)
+        lon2 = lon + d_lon
+    elif method == 'great_circle':
+        sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+        sin_d, cos_d = np.sin(delta), np.cos(delta)
+        lat2 = np.arcsin(np.clip(sin_lat * cos_d + cos_lat * sin_d * cos_h, -1.0, 1.0))
+        lon2 = lon + np.arctan2(sin_h * sin_d * cos_lat, cos_d - sin_lat * np.sin(lat2))
+    else:
+        raise ValueError(f"Unknown trajectory method: {method}")
+
+    track = np.degrees(np.stack([lat2, lon2], axis=-1))
+    track[..., 1] = (track[..., 1] + 180) % 360 - 180  # Keep longitudes in [-180, 180)
+    return track
+
+def known_course(speed, heading):
+    """Speed and heading arrays in which a contact missing either one is stationary."""
+    speed = np.asarray(speed, dtype=float)
+    heading = np.asarray(heading, dtype=float)
+    unknown = np.isnan(speed) | np.isnan(heading)
+    return np.where(unknown, 0.0, speed), np.where(unknown, 0.0, heading)
+
 def predict_trajectory(lat, lon, speed, heading, time_minutes, steps=10):
-    speed_km_per_min = speed * 1.852 / 60
-    step_time = time_minutes / steps
-    trajectory = [[lat, lon]]
-    for _ in range(steps):
-        distance_km = speed_km_per_min * step_time
-        distance_deg = distance_km / 111
-        heading_rad = np.radians(heading)
-        lat += distance_deg * np.cos(heading_rad)
-        lon += distance_deg * np.sin(heading_rad) / np.cos(np.radians(lat))
-        trajectory.append([lat, lon])
-    return trajectory
-
-# Anomaly detection
+    return predict_trajectory_batch(lat, lon, speed, heading, time_minutes, steps)[0].tolist()
+
+def _app_redis():
+    from flask import current_app, has_app_context
+    return current_app.redis if has_app_context() else None
+
+# Anomaly detection (engines are configured from app.config by init_app)
+anomaly_model = AnomalyModelManager()
+risk_engine = RiskEngine()
+alert_engine = AlertEngine(redis_client=_app_redis)
+proximity_engine = ProximityEngine()
+
+ANOMALY_TRAIN_KEY = 'anomaly:train_queued'
+
+def queue_anomaly_training(contamination=0.1):
+    """Queue one training run; a Redis key dedupes it across web and worker processes."""
+    from flask import current_app, has_app_context
+    if not has_app_context():
+        return False
+    try:
+        if not current_app.redis.set(ANOMALY_TRAIN_KEY, 1, nx=True, ex=anomaly_model.bootstrap_retry_seconds):
+            return False
+        from app.tasks import train_anomaly_model
+        train_anomaly_model.delay(contamination)
+    except Exception:
+        # Scoring must not fail because Redis or the broker is down; the beat job still trains
+        current_app.logger.warning("Could not queue anomaly model training", exc_info=True)
+        return False
+    return True
+
 def detect_anomalies(df, contamination=0.1):
     if df.empty:
         return df
-    features = df[['speed', 'heading']].fillna(0)
-    iso_forest = IsolationForest(contamination=contamination, random_state=42)
-    df['anomaly'] = iso_forest.fit_predict(features)
-    df['risk_score'] = df.apply(calculate_risk_score, axis=1)
+    result = anomaly_model.score(df)
+    if result is not None:
+        df['anomaly_score'], df['anomaly'] = result
+        if anomaly_model.should_retrain():
+            queue_anomaly_training(contamination)
+    else:
+        # No trained artifact yet: have one trained, and until it lands fit on the batch itself
+        if anomaly_model.should_bootstrap():
+            queue_anomaly_training(contamination)
+        if len(df) >= anomaly_model.min_fit_rows:
+            features = df[['speed', 'heading']].fillna(0)
+            iso_forest = IsolationForest(contamination=contamination, random_state=42)
+            df['anomaly'] = iso_forest.fit_predict(features)
+        else:
+            df['anomaly'] = 1
+    if 'vessel_id' in df:
+        # New contacts are assessed against the whole nearby fleet, not just their own batch
+        pairs = proximity_engine.assess_against(df, fleet_near(df, proximity_engine.search_radius_nm))
+        df['min_cpa_nm'] = proximity_engine.min_cpa_per_vessel(pairs, df['vessel_id']).to_numpy()
+    risk = risk_engine.score_frame(df)
+    df[risk.columns] = risk
     return df
 
+def fleet_near(df, radius_nm):
+    """Last stored positions of contacts within ``radius_nm`` of the batch's bounding box."""
+    from flask import has_app_context
+    from app.extensions import db
+    from app.models import Vessel
+    if not has_app_context() or df['lat'].isna().all() or df['lon'].isna().all():
+        return pd.DataFrame(columns=['vessel_id', 'lat', 'lon', 'speed', 'heading'])
+    pad_lat = radius_nm / 60.0
+    lat_min, lat_max = df['lat'].min() - pad_lat, df['lat'].max() + pad_lat
+    query = db.select(Vessel.id.label('vessel_id'), Vessel.lat, Vessel.lon, Vessel.speed, Vessel.heading
+                      ).where(Vessel.lat.between(lat_min, lat_max))
+    pad_lon = pad_lat / max(np.cos(np.radians(min(max(abs(lat_min), abs(lat_max)), 90.0))), 1e-6)
+    lon_min, lon_max = df['lon'].min() - pad_lon, df['lon'].max() + pad_lon
+    if lon_min >= -180 and lon_max <= 180:  # Otherwise the box wraps; take every longitude
+        query = query.where(Vessel.lon.between(lon_min, lon_max))
+    return pd.read_sql(query, db.engine)
+
+@lru_cache(maxsize=32)
+def _risk_engine(speed_threshold, anomaly_weight):
+    if (speed_threshold, anomaly_weight) == (risk_engine.speed_threshold, risk_engine.anomaly_weight):
+        return risk_engine
+    return RiskEngine(risk_engine.zones, speed_threshold=speed_threshold, anomaly_weight=anomaly_weight,
+                      cpa_threshold_nm=risk_engine.cpa_threshold_nm)
+
 def calculate_risk_score(row, speed_threshold=12, anomaly_weight=30):
-    score = 0
-    if row['speed'] > speed_threshold:
-        score += 40
-    if (10 <= row['lat'] <= 15 and 43 <= row['lon'] <= 53) or \
-       (0 <= row['lat'] <= 5 and 65 <= row['lon'] <= 70) or \
-       (0 <= row['lat'] <= 5 and 97 <= row['lon'] <= 102):
-        score += 30
-    if row.get('anomaly', 1) == -1:
-        score += anomaly_weight
-    return min(score, 100)
+    engine = _risk_engine(speed_threshold, anomaly_weight)
+    factors = engine.contributions([row['lat']], [row['lon']], [row['speed']], [row.get('anomaly', 1)],
+                                   [row.get('min_cpa_nm', np.nan)])
+    return factors['risk_score'][0]
+
+# Heavy models are built on first use (or preloaded via MODEL_PRELOAD)
+def _load_embeddings():
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return CachedQueryEmbeddings(HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2"))
+
+def _load_vectorstore():
+    from langchain_community.vectorstores import Chroma
+    try:
+        from chromadb.api.client import SharedSystemClient
+        # Chroma caches one client per path; drop it so a reopen reads other processes' writes
+        SharedSystemClient.clear_system_cache()
+    except ImportError:
+        pass
+    return Chroma(embedding_function=models.get('embeddings'), collection_name="naval_docs",
+                  persist_directory=rag.persist_dir)
+
+def _load_ocr_reader():
+    import easyocr
+    return easyocr.Reader(['en'])
+
+models = ModelRegistry()
+models.register('embeddings', _load_embeddings)
+models.register('vectorstore', _load_vectorstore)
+models.register('ocr_reader', _load_ocr_reader)
 
 # RAG setup
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-vectorstore = Chroma(embedding_function=embeddings, collection_name="naval_docs")
+rag = RAGService(models, redis_client=_app_redis)
 
 def add_document_to_rag(file_path):
-    loader = PyPDFLoader(file_path)
-    docs = loader.load_and_split()
-    vectorstore.add_documents(docs)
+    # Embedding runs on a Celery worker; the web process only queues the file
+    from app.tasks import ingest_rag_document
+    return ingest_rag_document.delay(file_path)
 
 def query_rag(query):
-    llm = Anthropic(model="claude-3-sonnet-20240229", api_key=Config.ANTHROPIC_API_KEY)
-    qa = RetrievalQA.from_chain_type(llm=llm, chain_type="stuff", retriever=vectorstore.as_retriever())
-    return qa.run(query)
+    return rag.query(query)
 
 # OCR functionality
-reader = easyocr.Reader(['en'])
+ocr_service = OCRService()
 
 def perform_ocr(image_path):
-    image = cv2.imread(image_path)
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    result = reader.readtext(gray)
-    text = ' '.join([detection[1] for detection in result])
-    return text
+    return ocr_service.read_batch([image_path])[0]
+
+def perform_ocr_batch(images):
+    return ocr_service.read_batch(images)
 
 # Boundary crossing
+@lru_cache(maxsize=32)
+def _boundary_registry(boundary):
+    return BoundaryRegistry({'boundary': boundary})
+
 def check_boundary_crossing(trajectory, boundary):
     try:
-        traj_line = LineString(trajectory)
-        boundary_lines = MultiLineString([LineString([boundary[i], boundary[(i + 1) % len(boundary)]]) for i in range(len(boundary))])
-        return traj_line.intersects(boundary_lines)
+        registry = _boundary_registry(tuple(map(tuple, boundary)))
+        return registry.crosses('boundary', trajectory)
     except Exception:
-        return False
\ No newline at end of file
+        return False
+
+def generate_alerts(df, trajectories, registry):
+    """Bulk boundary alerts for every row of ``df`` against all registered boundaries."""
+    alerts = []
+    if df.empty:
+        return alerts
+    for vessel_id, crossed in zip(df['vessel_id'], registry.crossed_names(trajectories)):
+        for name in crossed:
+            alerts.append({
+                'vessel_id': vessel_id,
+                'type': 'boundary_crossing',
+                'boundary': name,
+                'message': f"Vessel {vessel_id} predicted to cross {name}",
+            })
+    return alerts
+
+def init_app(app):
+    """Configure the shared engines from ``app.config``; called by ``create_app``."""
+    for engine in (anomaly_model, risk_engine, alert_engine, proximity_engine, rag, ocr_service):
+        engine.init_app(app)
+    _risk_engine.cache_clear()
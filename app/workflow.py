@@ -0,0 +1,89 @@
+import json
+import os
+import re
+import time
+import uuid
+from flask import current_app
+
+PENDING_KEY = 'workflow:pending'
+SCHEDULED_KEY = 'workflow:scheduled'
+JOB_KEY = 'workflow:job:{}'
+JOB_TTL_SECONDS = 86400
+IMAGE_ID_PATTERN = re.compile(r'[0-9a-f]{32}\.[a-z]{3,4}')
+
+
+def _job_key(job_id):
+    return JOB_KEY.format(job_id)
+
+
+def set_job_status(job_id, status, **fields):
+    redis = current_app.redis
+    key = _job_key(job_id)
+    mapping = {'status': status, 'updated': time.time()}
+    mapping.update({name: json.dumps(value, default=str) for name, value in fields.items()})
+    redis.hset(key, mapping=mapping)
+    redis.expire(key, JOB_TTL_SECONDS)
+
+
+def get_job_status(job_id):
+    raw = current_app.redis.hgetall(_job_key(job_id))
+    if not raw:
+        return None
+    job = {k.decode(): v.decode() for k, v in raw.items()}
+    for name in list(job):
+        if name not in ('status', 'updated'):
+            job[name] = json.loads(job[name])
+    job['job_id'] = job_id
+    return job
+
+
+def enqueue_contact(vessel, **extra):
+    """Queue a contact for the next micro-batch and return its job id.
+
+    The first contact of a window schedules one ``run_workflow_batch`` task
+    ``WORKFLOW_BATCH_WINDOW`` seconds out; everything queued until then shares
+    a single detection -> analysis -> response pass.
+    """
+    from app.tasks import run_workflow_batch
+    job_id = uuid.uuid4().hex
+    redis = current_app.redis
+    set_job_status(job_id, 'queued')
+    redis.rpush(PENDING_KEY, json.dumps({'job_id': job_id, 'vessel': vessel, **extra}))
+    window = current_app.config['WORKFLOW_BATCH_WINDOW']
+    if redis.set(SCHEDULED_KEY, job_id, nx=True, ex=max(int(window * 10), 60)):
+        run_workflow_batch.apply_async(countdown=window)
+    return job_id
+
+
+def drain_pending(max_items):
+    """Atomically take up to ``max_items`` queued contacts and reopen the window."""
+    redis = current_app.redis
+    with redis.pipeline() as pipe:
+        pipe.lrange(PENDING_KEY, 0, max_items - 1)
+        pipe.ltrim(PENDING_KEY, max_items, -1)
+        pipe.delete(SCHEDULED_KEY)
+        items, _, _ = pipe.execute()
+    return [json.loads(item) for item in items]
+
+
+def save_contact_image(upload):
+    """Store an uploaded image under CONTACT_IMAGE_DIR; returns its image id or None."""
+    extension = os.path.splitext(upload.filename or '')[1].lower()
+    if extension not in current_app.config['CONTACT_IMAGE_EXTENSIONS']:
+        return None
+    image_id = uuid.uuid4().hex + extension
+    os.makedirs(current_app.config['CONTACT_IMAGE_DIR'], exist_ok=True)
+    upload.save(os.path.join(current_app.config['CONTACT_IMAGE_DIR'], image_id))
+    return image_id
+
+
+def contact_image_path(image_id):
+    """Path of a stored contact image, or None for unknown or malformed ids.
+
+    Clients only ever name images by id, so the workers never open a path that
+    came from a request.
+    """
+    if not isinstance(image_id, str) or not IMAGE_ID_PATTERN.fullmatch(image_id):
+        return None
+    path = os.path.join(current_app.config['CONTACT_IMAGE_DIR'], image_id)
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,173 @@
+"""Reproducible benchmarks for the surveillance hot paths.
+
+Builds synthetic fleets (1k, 10k and 100k contacts by default) in a throwaway
+SQLite database, or in the database given with --database-url, and times the
+trajectory, anomaly, risk, boundary, proximity, dashboard refresh and REST
+listing stages. LLM, OCR and embedding models are replaced by stubs, so no
+network access or model downloads are needed.
+
+    python benchmarks/bench_pipeline.py --sizes 1000 10000 100000 --repeat 3
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.extensions import db  # noqa: E402
+
+BOUNDARY = [[5.0, 65.0], [25.0, 65.0], [25.0, 80.0], [5.0, 80.0]]
+
+
+class StubMCP:
+    def send_message_with_context(self, session_id, message, **kwargs):
+        return 'stub response'
+
+    @staticmethod
+    def text(content):
+        return content if isinstance(content, str) else ''
+
+
+class StubEmbeddings:
+    def embed_query(self, text):
+        return [0.0] * 384
+
+    def embed_documents(self, texts):
+        return [[0.0] * 384 for _ in texts]
+
+
+class StubReader:
+    def readtext(self, image):
+        return []
+
+
+def synthetic_fleet(size, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'vessel_id': [f'BENCH{i:07d}' for i in range(size)],
+        'lat': rng.uniform(-10, 30, size),
+        'lon': rng.uniform(40, 110, size),
+        'speed': rng.gamma(2.0, 6.0, size),
+        'heading': rng.uniform(0, 360, size),
+        'timestamp': time.time() - rng.uniform(0, 3600, size),
+        'is_friendly': rng.integers(0, 2, size),
+    })
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def run_size(app, size, repeat, skip_scalar, model_dir):
+    from app.boundaries import BoundaryRegistry
+    from app.ingest import bulk_upsert_vessels
+    from app.utils import (anomaly_model, calculate_risk_score, check_boundary_crossing, detect_anomalies,
+                           predict_trajectory, predict_trajectory_batch, proximity_engine, risk_engine)
+    from app.blueprints.dashboard.sockets import broadcaster
+
+    fleet = synthetic_fleet(size)
+    results = {}
+
+    db.drop_all()
+    db.create_all()
+    results['ingest_bulk_upsert'] = measure(lambda: bulk_upsert_vessels(fleet.to_dict(orient='records')), 1)
+
+    if not skip_scalar:
+        results['predict_trajectory_loop'] = measure(lambda: [
+            predict_trajectory(r.lat, r.lon, r.speed, r.heading, 30) for r in fleet.itertuples()], repeat)
+    results['predict_trajectory_batch'] = measure(lambda: predict_trajectory_batch(
+        fleet['lat'], fleet['lon'], fleet['speed'], fleet['heading'], 30), repeat)
+    trajectories = predict_trajectory_batch(fleet['lat'], fleet['lon'], fleet['speed'], fleet['heading'], 30)
+
+    anomaly_model.model_dir = os.path.join(model_dir, str(size))
+    results['detect_anomalies_fit'] = measure(lambda: detect_anomalies(fleet.copy()), repeat)
+    anomaly_model.train(fleet)
+    results['detect_anomalies_served'] = measure(lambda: detect_anomalies(fleet.copy()), repeat)
+    results['detect_anomalies_single_row'] = measure(lambda: detect_anomalies(fleet.iloc[:1].copy()), repeat)
+
+    scored = fleet.assign(anomaly=1)
+    if not skip_scalar:
+        results['calculate_risk_score_apply'] = measure(lambda: scored.apply(calculate_risk_score, axis=1), repeat)
+    results['risk_engine_score_frame'] = measure(lambda: risk_engine.score_frame(scored), repeat)
+
+    if not skip_scalar:
+        results['check_boundary_crossing_loop'] = measure(lambda: [
+            check_boundary_crossing(t, BOUNDARY) for t in trajectories], repeat)
+    registry = BoundaryRegistry({'bench': BOUNDARY})
+    results['boundary_registry_crossings'] = measure(lambda: registry.crossings(trajectories), repeat)
+
+    results['proximity_assess'] = measure(lambda: proximity_engine.assess_frame(fleet), repeat)
+
+    with app.app_context():
+        broadcaster._state = broadcaster._state.iloc[0:0]
+        results['dashboard_refresh_full'] = measure(broadcaster.tick, 1)
+        moved = fleet.sample(frac=0.05, random_state=1).assign(lat=lambda d: d['lat'] + 0.01)
+        bulk_upsert_vessels(moved.to_dict(orient='records'), trajectory_minutes=None)
+        results['dashboard_refresh_delta'] = measure(broadcaster.tick, 1)
+        results['dashboard_refresh_idle'] = measure(broadcaster.tick, repeat)
+
+    client = app.test_client()
+    results['rest_list_page'] = measure(lambda: client.get('/vessels/?limit=500'), repeat)
+    etag = client.get('/vessels/?limit=500').headers.get('ETag')
+    results['rest_list_not_modified'] = measure(
+        lambda: client.get('/vessels/?limit=500', headers={'If-None-Match': etag}), repeat)
+    results['rest_export_ndjson'] = measure(lambda: client.get('/vessels/?format=ndjson').get_data(), 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--database-url', help='Defaults to a temporary SQLite file')
+    parser.add_argument('--skip-scalar', action='store_true', help='Skip the per-vessel reference loops')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='msa-bench-')
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        SOCKETIO_MESSAGE_QUEUE = None
+        RATELIMIT_ENABLED = False
+        MODEL_PRELOAD = []
+        TESTING = True
+
+    app = create_app(BenchConfig)
+    app.mcp = StubMCP()
+    # The dashboard hook checks app.boundaries, so the refresh timings include boundary cost
+    app.boundaries.register('bench', BOUNDARY)
+    from app.utils import anomaly_model, models
+    models.register('embeddings', StubEmbeddings)
+    models.register('vectorstore', lambda: None)
+    models.register('ocr_reader', StubReader)
+    anomaly_model.drift_threshold = float('inf')
+
+    all_results = {}
+    with app.app_context():
+        for size in args.sizes:
+            all_results[size] = run_size(app, size, args.repeat, args.skip_scalar, workdir)
+            if not args.json:
+                print(f"\n== {size} contacts ==")
+                for stage, seconds in all_results[size].items():
+                    print(f"{stage:32s} {seconds * 1000:12.2f} ms")
+    if args.json:
+        print(json.dumps(all_results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
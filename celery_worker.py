@@ -1,5 +1,34 @@
-from app import create_app, extensions
-from app.extensions import celery
+import os
+import shutil
+
+# Prefork children record metrics in their own memory; in multiprocess mode they
+# write to shared files instead, which the parent's HTTP server merges. The
+# directory must be set before prometheus_client is first imported.
+if os.environ.get('METRICS_PORT'):
+    metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/msa-celery-metrics')
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+from app import create_app, extensions, tasks
 
 app = create_app()
-app.app_context().push()
\ No newline at end of file
+celery = app.celery
+app.app_context().push()
+
+# The prefork pool already runs tasks in parallel; a per-child OCR process pool
+# would only multiply EasyOCR readers
+from app.utils import ocr_service
+ocr_service.workers = 0
+
+if os.environ.get('METRICS_PORT'):
+    from celery.signals import worker_init, worker_process_shutdown
+    from app.metrics import mark_process_dead, start_metrics_server
+
+    @worker_init.connect
+    def start_metrics(**kwargs):
+        # Only the worker's main process serves; beat imports this module too
+        start_metrics_server(int(os.environ['METRICS_PORT']))
+
+    @worker_process_shutdown.connect
+    def retire_metrics(pid=None, **kwargs):
+        mark_process_dead(pid or os.getpid())
@@ -0,0 +1,117 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    from app import create_app
+    from app.extensions import db
+
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        SOCKETIO_MESSAGE_QUEUE = None
+        RATELIMIT_ENABLED = False
+        MODEL_PRELOAD = []
+        ANOMALY_MODEL_DIR = str(tmp_path / 'models' / 'anomaly')
+        OCR_CACHE_DIR = str(tmp_path / 'cache' / 'ocr')
+        RAG_PERSIST_DIR = str(tmp_path / 'chroma')
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class FakeRedis:
+    """The slice of redis-py the app uses, in memory; values come back as bytes."""
+
+    def __init__(self):
+        self.data = {}
+
+    @staticmethod
+    def _bytes(value):
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = self._bytes(value)
+        return True
+
+    def incr(self, key):
+        value = int(self.data.get(key, b'0')) + 1
+        self.data[key] = self._bytes(value)
+        return value
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def expire(self, key, seconds):
+        return key in self.data
+
+    def hset(self, key, mapping):
+        self.data.setdefault(key, {}).update({self._bytes(k): self._bytes(v) for k, v in mapping.items()})
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(self._bytes(v) for v in values)
+        return len(self.data[key])
+
+    def lrange(self, key, start, end):
+        items = self.data.get(key, [])
+        return items[start:None if end == -1 else end + 1]
+
+    def ltrim(self, key, start, end):
+        self.data[key] = self.lrange(key, start, end)
+
+    def llen(self, key):
+        return len(self.data.get(key, []))
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis, self.calls = redis, []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+@pytest.fixture
+def redis(app, monkeypatch):
+    from app import tasks
+    app.redis = FakeRedis()
+    scheduled = []
+    monkeypatch.setattr(tasks.run_workflow_batch, 'apply_async', lambda **kwargs: scheduled.append(kwargs))
+    monkeypatch.setattr(tasks.ocr_batch, 'delay', lambda paths: scheduled.append({'ocr': paths}))
+    app.redis.scheduled = scheduled
+    return app.redis
@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+
+
+class FakeMCP:
+    def __init__(self):
+        self.sessions = []
+
+    def send_message_with_context(self, session_id, message, **kwargs):
+        self.sessions.append(session_id)
+        return f'reply to {session_id}'
+
+    def send_many(self, requests):
+        return [self.send_message_with_context(session_id, message, **kwargs)
+                for session_id, message, kwargs in requests]
+
+    @staticmethod
+    def text(content):
+        return content
+
+
+@pytest.fixture
+def workflow(app, monkeypatch):
+    from app.agents import analysis_agent, orchestrator
+    monkeypatch.setattr(analysis_agent, 'query_rag', lambda query: 'no history')
+    mcp = FakeMCP()
+    yield mcp, lambda data: orchestrator.orchestrate_workflow(mcp, data)
+    orchestrator._workflows.pop(id(mcp), None)
+
+
+def fleet():
+    return pd.DataFrame([
+        {'vessel_id': 'a', 'lat': 10.0, 'lon': 20.0, 'speed': 12.0, 'heading': 90.0, 'timestamp': 1.0},
+        {'vessel_id': 'b', 'lat': 10.5, 'lon': 20.5, 'speed': 8.0, 'heading': 180.0, 'timestamp': 1.0},
+    ])
+
+
+def test_incident_id_reaches_every_agent(workflow):
+    mcp, run = workflow
+    result = run({'vessel_df': fleet()})
+    incident = result['incident_id']
+    assert {s.split(':')[0] for s in mcp.sessions} == {'detection', 'analysis', 'response'}
+    assert all(s.endswith(':' + incident) for s in mcp.sessions)
+    assert result['response_plan'] == f'reply to response:{incident}'
+
+
+def test_session_keys_differ_per_run(workflow):
+    mcp, run = workflow
+    run({'vessel_df': fleet()})
+    first = set(mcp.sessions)
+    mcp.sessions.clear()
+    run({'vessel_df': fleet()})
+    assert len(first) == 3
+    assert first.isdisjoint(mcp.sessions)
+
+
+def test_response_alert_names_the_detected_vessels(workflow, monkeypatch):
+    from app.utils import alert_engine
+    raised = []
+    monkeypatch.setattr(alert_engine, 'notify', lambda alert, now=None: raised.append(alert))
+    mcp, run = workflow
+    result = run({'vessel_df': fleet()})
+    run({'vessel_df': fleet().iloc[:1]})
+    assert result['vessel_ids'] == ['a', 'b']
+    assert raised[0]['vessel_id'].startswith('group:')
+    assert raised[1]['vessel_id'] == 'a'
@@ -0,0 +1,115 @@
+import time
+import pytest
+from app.ais import decode_csv_batch, decode_nmea, decode_nmea_batch
+from app.ingest import IngestPipeline, decoded_batches
+
+CLASS_A = '!AIVDM,1,1,,A,13aEOK?P00PD2wVMdLDRhgvL289?,0*26'
+CLASS_A_COG = '!AIVDM,1,1,,B,177KQJ5000G?tO`K>RA1wUbN0TKH,0*5C'
+CLASS_B_TAGGED = '\\s:2573345,c:1241544035*7F\\!AIVDM,1,1,,A,B52K>;h00Fc>jpUlNV@ikwpUoP06,0*4C'
+
+
+def test_class_a_position_report():
+    record = decode_nmea(CLASS_A, received_at=100.0)
+    assert record['vessel_id'] == '244670316'
+    assert record['lat'] == pytest.approx(51.89475, abs=1e-5)
+    assert record['lon'] == pytest.approx(4.379285, abs=1e-5)
+    assert record['speed'] == 0.0
+    assert record['heading'] == pytest.approx(70.6)
+    assert record['timestamp'] == 100.0
+
+
+def test_class_a_true_heading():
+    record = decode_nmea(CLASS_A_COG)
+    assert record['vessel_id'] == '477553000'
+    assert record['lat'] == pytest.approx(47.582833, abs=1e-5)
+    assert record['lon'] == pytest.approx(-122.345833, abs=1e-5)
+    assert record['heading'] == 181.0
+
+
+def test_class_b_with_tag_block_time():
+    record = decode_nmea(CLASS_B_TAGGED, received_at=100.0)
+    assert record['vessel_id'] == '338087471'
+    assert record['lat'] == pytest.approx(40.68454, abs=1e-5)
+    assert record['lon'] == pytest.approx(-74.0721317, abs=1e-5)
+    assert record['speed'] == pytest.approx(0.1)
+    assert record['heading'] == pytest.approx(79.6)
+    assert record['timestamp'] == 1241544035.0
+
+
+def test_malformed_tag_time_falls_back_to_receive_time():
+    line = CLASS_B_TAGGED.replace('c:1241544035', 'c:12415x4035')
+    assert decode_nmea(line, received_at=100.0)['timestamp'] == 100.0
+
+
+def test_bad_sentences_are_dropped():
+    assert decode_nmea(CLASS_A.replace('*26', '*27')) is None  # checksum
+    assert decode_nmea('!AIVDM,2,1,3,B,55P5TL01VIaAL@7WKO@mBplU@<PDhh000000001S;AJ::4A80?4i@E53,0*3E') is None
+    assert decode_nmea('$GPGGA,092750.000,5321.6802,N,00630.3372,W,1,8,1.03,61.7,M,55.2,M,,*76') is None
+    assert decode_nmea_batch([CLASS_A, 'garbage', ''], received_at=1.0) == [decode_nmea(CLASS_A, 1.0)]
+
+
+def test_csv_rows_with_bad_values_are_skipped():
+    lines = [
+        '1,10.0,20.0,12.5,90,1000,1',
+        '2,10.0,20.0,fast,90,1000,0',
+        '3,10.0,20.0,,,2024-01-01T00:00:00+00:00,',
+        ',10.0,20.0,1,1,1000,1',
+        '5,95.0,20.0,1,1,1000,1',
+        '6,10.0,20.0,1,1,1000,yes',
+    ]
+    records = decode_csv_batch(lines, ['mmsi', 'lat', 'lon', 'sog', 'cog', 'timestamp', 'is_friendly'],
+                               received_at=5.0)
+    assert [r['vessel_id'] for r in records] == ['1', '3']
+    assert records[0] == {'vessel_id': '1', 'lat': 10.0, 'lon': 20.0, 'speed': 12.5, 'heading': 90.0,
+                          'is_friendly': 1, 'timestamp': 1000.0}
+    assert records[1]['speed'] is None and records[1]['timestamp'] == 1704067200.0
+
+
+def test_naive_csv_times_are_utc(monkeypatch):
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    try:
+        record, = decode_csv_batch(['1,10.0,20.0,2024-01-01T00:00:00'], ['MMSI', 'LAT', 'LON', 'BaseDateTime'])
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+    assert record['timestamp'] == 1704067200.0
+
+
+def quiet_feed():
+    yield CLASS_A
+    time.sleep(0.5)
+    yield CLASS_A_COG
+
+
+def test_live_batches_do_not_wait_for_a_full_batch():
+    started = time.monotonic()
+    batches = decoded_batches(quiet_feed(), batch_size=1000, max_wait=0.1)
+    first = next(batches)
+    assert [r['vessel_id'] for r in first] == ['244670316']
+    assert time.monotonic() - started < 0.4
+    rest = [record for batch in batches for record in batch]
+    assert [r['vessel_id'] for r in rest] == ['477553000']
+
+
+def test_pipeline_flushes_window_on_empty_batch():
+    written = []
+    pipeline = IngestPipeline(writer=lambda rows: written.extend(rows) or len(rows), window_seconds=0.05)
+    pipeline.add([{'vessel_id': 'a', 'timestamp': 1.0}, {'vessel_id': 'a', 'timestamp': 2.0}])
+    assert written == []
+    time.sleep(0.06)
+    pipeline.add([])
+    assert written == [{'vessel_id': 'a', 'timestamp': 2.0}]
+
+
+def test_unknown_course_is_stored_as_a_stationary_track(app):
+    import json
+    from app.ingest import bulk_upsert_vessels
+    from app.extensions import db
+    from app.models import Vessel
+    bulk_upsert_vessels([{'vessel_id': 'a', 'lat': 5.0, 'lon': 5.0, 'speed': 12.0, 'heading': None, 'timestamp': 1.0},
+                         {'vessel_id': 'b', 'lat': 6.0, 'lon': 6.0, 'speed': float('nan'), 'heading': 90.0,
+                          'timestamp': 1.0}])
+    for vessel_id, start in (('a', [5.0, 5.0]), ('b', [6.0, 6.0])):
+        trajectory = json.loads(db.session.get(Vessel, vessel_id).trajectory)
+        assert all(point == pytest.approx(start) for point in trajectory)
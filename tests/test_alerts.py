@@ -0,0 +1,110 @@
+import pandas as pd
+from app.alerts import AlertEngine, alert_key
+from app.proximity import ProximityEngine
+
+
+def cpa(a, b):
+    return {'vessel_id': a, 'other_vessel_id': b, 'type': 'cpa', 'message': 'close'}
+
+
+def test_pair_key_ignores_vessel_order():
+    assert alert_key(cpa('b', 'a')) == alert_key(cpa('a', 'b'))
+
+
+def test_flipped_pair_does_not_raise_twice():
+    engine = AlertEngine(cooldown_seconds=300, clear_after_seconds=60)
+    assert len(engine.evaluate([cpa('a', 'b')], now=1000)) == 1
+    assert engine.evaluate([cpa('b', 'a')], now=1010) == []
+
+
+def test_proximity_alerts_are_reported_in_id_order():
+    pairs = pd.DataFrame({'vessel_a': ['z'], 'vessel_b': ['m'], 'range_nm': [1.0],
+                          'cpa_nm': [0.2], 'tcpa_min': [5.0]})
+    alert, = ProximityEngine.alerts(pairs)
+    assert (alert['vessel_id'], alert['other_vessel_id']) == ('m', 'z')
+
+
+def boundary(vessel_id):
+    return {'vessel_id': vessel_id, 'type': 'boundary_crossing', 'boundary': 'eez', 'message': 'crossing'}
+
+
+def states(events):
+    return [(event['vessel_id'], event['state']) for event in events]
+
+
+def test_condition_clears_only_after_staying_absent():
+    engine = AlertEngine(cooldown_seconds=300, clear_after_seconds=60)
+    assert states(engine.evaluate([boundary('a')], now=1000)) == [('a', 'raised')]
+    assert engine.evaluate([], now=1030) == []
+    assert engine.evaluate([boundary('a')], now=1050) == []  # flicker resets the clock
+    assert engine.evaluate([], now=1060) == []
+    assert engine.evaluate([], now=1100) == []
+    assert states(engine.evaluate([], now=1120)) == [('a', 'cleared')]
+
+
+def test_reraise_within_cooldown_is_silent():
+    engine = AlertEngine(cooldown_seconds=300, clear_after_seconds=0)
+    engine.evaluate([boundary('a')], now=1000)
+    assert states(engine.evaluate([], now=1010)) == [('a', 'cleared')]
+    assert engine.evaluate([boundary('a')], now=1100) == []
+    engine.evaluate([], now=1110)
+    assert states(engine.evaluate([boundary('a')], now=1500)) == [('a', 'raised')]
+
+
+def test_partial_pass_leaves_other_vessels_alone():
+    engine = AlertEngine(cooldown_seconds=300, clear_after_seconds=0)
+    engine.evaluate([boundary('a'), cpa('b', 'c')], now=1000)
+    assert engine.evaluate([], scope={'z'}, now=1100) == []
+    assert states(engine.evaluate([], scope={'c'}, now=1200)) == [('b', 'cleared')]
+    assert states(engine.evaluate([], scope={'a'}, now=1300)) == [('a', 'cleared')]
+
+
+def test_missing_condition_clears_after_its_vessel_goes_quiet():
+    engine = AlertEngine(cooldown_seconds=300, clear_after_seconds=60)
+    engine.evaluate([boundary('a')], now=1000)
+    assert engine.evaluate([], scope={'a'}, now=1010) == []  # condition gone, vessel then stops moving
+    assert engine.evaluate([], scope={'z'}, now=1040) == []
+    assert states(engine.evaluate([], scope=set(), now=1070)) == [('a', 'cleared')]
+
+
+def test_notify_dedupes_within_cooldown_and_forgets_old_keys():
+    engine = AlertEngine(cooldown_seconds=300)
+    plan = {'vessel_id': 'incident:1', 'type': 'response_plan', 'message': 'plan'}
+    assert engine.notify(plan, now=1000)['state'] == 'raised'
+    assert engine.notify(plan, now=1100) is None
+    engine.notify(dict(plan, vessel_id='incident:2'), now=1400)
+    assert list(engine._cleared) == [alert_key(dict(plan, vessel_id='incident:2'))]
+
+
+def test_notify_cooldown_is_shared_through_redis(redis):
+    import redis as redis_py
+    plan = {'vessel_id': 'incident:1', 'type': 'response_plan', 'message': 'plan'}
+    first, second = (AlertEngine(cooldown_seconds=300, redis_client=lambda: redis) for _ in range(2))
+    assert first.notify(plan, now=1000)['state'] == 'raised'
+    assert second.notify(plan, now=1001) is None  # another prefork child, same incident
+    assert list(redis.data) == ['alerts:notify:incident:1:response_plan:None']
+
+    class DownRedis:
+        def set(self, *args, **kwargs):
+            raise redis_py.ConnectionError('down')
+
+    fallback = AlertEngine(cooldown_seconds=300, redis_client=DownRedis)
+    assert fallback.notify(plan, now=1000) is not None
+    assert fallback.notify(plan, now=1100) is None
+
+
+def test_flush_writes_buffered_events_in_one_batch(app):
+    from app.models import Alert
+    engine = AlertEngine(cooldown_seconds=300, clear_after_seconds=0, flush_size=3, flush_seconds=3600)
+    engine.evaluate([boundary('a'), cpa('b', 'c')], now=1000)
+    assert engine.maybe_flush() == 0  # two events, below flush_size
+    engine.notify({'vessel_id': 'incident:1', 'type': 'response_plan', 'message': 'plan'}, now=1001)
+    assert engine.maybe_flush() == 3
+    assert engine.flush() == 0
+    engine.evaluate([], now=1100)
+    assert engine.flush() == 2
+    rows = Alert.query.order_by(Alert.id).all()
+    assert [(row.vessel_id, row.type, row.state) for row in rows] == [
+        ('a', 'boundary_crossing', 'raised'), ('b', 'cpa', 'raised'), ('incident:1', 'response_plan', 'raised'),
+        ('a', 'boundary_crossing', 'cleared'), ('b', 'cpa', 'cleared')]
+    assert rows[-1].timestamp == 1100
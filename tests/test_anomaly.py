@@ -0,0 +1,121 @@
+import glob
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import anomaly
+from app.anomaly import AnomalyModelManager
+
+
+@pytest.fixture(autouse=True)
+def versions(monkeypatch):
+    # Versions are second-resolution timestamps; hand out distinct ones
+    counter = itertools.count(1)
+    monkeypatch.setattr(anomaly.time, 'strftime', lambda fmt: f'20260101{next(counter):06d}')
+
+
+def fleet(n=200, speed=12.0, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'speed': rng.normal(speed, 1.0, n),
+        'heading': rng.uniform(0, 360, n),
+    })
+
+
+def bump_latest(manager):
+    # Make sure the pointer's mtime changes even on coarse-grained filesystems
+    stat = os.stat(manager._latest_path)
+    os.utime(manager._latest_path, (stat.st_atime, stat.st_mtime + 1))
+
+
+def test_score_without_model_returns_none(tmp_path):
+    manager = AnomalyModelManager(str(tmp_path))
+    assert manager.score(fleet()) is None
+    assert manager.version is None
+
+
+def test_train_and_score(tmp_path):
+    manager = AnomalyModelManager(str(tmp_path))
+    version = manager.train(fleet())
+    assert manager.version == version
+    assert open(os.path.join(tmp_path, 'LATEST')).read() == f'iforest-{version}.joblib'
+
+    df = pd.concat([fleet(20, seed=1), pd.DataFrame({'speed': [80.0], 'heading': [np.nan]})],
+                   ignore_index=True)
+    scores, labels = manager.score(df)
+    assert len(scores) == len(labels) == len(df)
+    assert set(labels) <= {-1, 1}
+    assert labels[-1] == -1
+    assert scores[-1] == scores.min()
+
+
+def test_other_manager_picks_up_new_version(tmp_path):
+    trainer = AnomalyModelManager(str(tmp_path))
+    server = AnomalyModelManager(str(tmp_path))
+    first = trainer.train(fleet())
+    assert server.version == first
+    model = server._artifact['model']
+    server.score(fleet(10))
+    assert server._artifact['model'] is model  # unchanged pointer is not reloaded
+
+    second = trainer.train(fleet(seed=1))
+    bump_latest(trainer)
+    assert server.version == second
+    assert server._artifact['model'] is not model
+
+
+def test_prune_keeps_newest_versions(tmp_path):
+    manager = AnomalyModelManager(str(tmp_path), keep_versions=2)
+    trained = [manager.train(fleet(50, seed=seed)) for seed in range(4)]
+    kept = sorted(os.path.basename(path) for path in glob.glob(os.path.join(tmp_path, 'iforest-*.joblib')))
+    assert kept == [f'iforest-{version}.joblib' for version in trained[-2:]]
+    assert manager.version == trained[-1]
+
+
+def test_drift_requests_retrain_once_per_model(tmp_path):
+    manager = AnomalyModelManager(str(tmp_path), drift_threshold=3.0, drift_alpha=0.5)
+    manager.train(fleet())
+    manager.score(fleet(50, seed=1))
+    assert not manager.drifted
+    assert not manager.should_retrain()
+
+    for seed in range(5):
+        manager.score(fleet(50, speed=40.0, seed=seed))
+    assert manager.drifted
+    assert manager.should_retrain()
+    assert not manager.should_retrain()
+
+    manager.train(fleet(speed=40.0))
+    bump_latest(manager)
+    manager.score(fleet(50, speed=40.0, seed=9))
+    assert not manager.drifted
+    assert not manager.should_retrain()
+
+
+def test_bootstrap_is_requested_once_per_window(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(anomaly.time, 'monotonic', lambda: clock[0])
+    manager = AnomalyModelManager(str(tmp_path), bootstrap_retry_seconds=600)
+    assert manager.should_bootstrap()
+    assert not manager.should_bootstrap()
+    clock[0] += 601
+    assert manager.should_bootstrap()
+    manager.train(fleet())
+    clock[0] += 601
+    assert not manager.should_bootstrap()
+
+
+def test_unserved_model_queues_one_training_run(app, redis, tmp_path, monkeypatch):
+    from app import tasks, utils
+    queued = []
+    monkeypatch.setattr(tasks.train_anomaly_model, 'delay', lambda contamination: queued.append(contamination))
+    for worker in range(2):  # two processes, each with its own manager, share one Redis
+        monkeypatch.setattr(utils, 'anomaly_model', AnomalyModelManager(str(tmp_path)))
+        for _ in range(2):
+            scored = utils.detect_anomalies(fleet(60).assign(lat=0.0, lon=0.0))
+            assert set(scored['anomaly']) <= {-1, 1}
+    assert queued == [0.1]
+    assert redis.get(utils.ANOMALY_TRAIN_KEY) is not None
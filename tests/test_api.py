@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+
+def test_bulk_post_keeps_newest_record_per_vessel(client):
+    response = client.post('/vessels/bulk', json=[
+        {'vessel_id': 'a', 'lat': 1.0, 'lon': 2.0, 'timestamp': 10},
+        {'vessel_id': 'a', 'lat': 1.5, 'lon': 2.0, 'timestamp': 11},
+    ])
+    assert response.status_code == 200  # CSRF-exempt, no duplicate-key conflict
+    assert client.get('/vessels/').json[0]['lat'] == 1.5
+
+
+def test_bulk_patch_reports_missing_and_stale(client):
+    client.post('/vessels/bulk', json=[{'vessel_id': 'a', 'lat': 1.0, 'lon': 2.0, 'timestamp': 10}])
+    response = client.patch('/vessels/bulk', json=[
+        {'vessel_id': 'a', 'lat': 9.0, 'timestamp': 5},
+        {'vessel_id': 'ghost', 'lat': 1.0},
+    ])
+    assert response.json == {'updated': 0, 'missing': ['ghost'], 'stale': ['a']}
+    assert client.get('/vessels/').json[0]['lat'] == 1.0
+
+
+def test_bulk_patch_recomputes_trajectory_and_records_history(app, client):
+    from app.extensions import db
+    from app.models import TrackPoint, Vessel
+    client.post('/vessels/bulk', json=[{'vessel_id': 'a', 'lat': 1.0, 'lon': 2.0, 'speed': 10, 'heading': 0,
+                                        'timestamp': 10}])
+    before = db.session.get(Vessel, 'a').trajectory
+    client.patch('/vessels/bulk', json=[{'vessel_id': 'a', 'lat': 5.0}])
+    vessel = db.session.get(Vessel, 'a')
+    assert vessel.lat == 5.0 and vessel.trajectory != before
+    assert TrackPoint.query.filter_by(vessel_id='a').count() == 2
+
+
+def test_etag_changes_when_an_older_vessel_moves(client):
+    client.post('/vessels/bulk', json=[
+        {'vessel_id': 'old', 'lat': 1.0, 'lon': 2.0, 'timestamp': 10},
+        {'vessel_id': 'new', 'lat': 3.0, 'lon': 4.0, 'timestamp': 100},
+    ])
+    etag = client.get('/vessels/').headers['ETag']
+    assert client.get('/vessels/', headers={'If-None-Match': etag}).status_code == 304
+
+    client.patch('/vessels/bulk', json=[{'vessel_id': 'old', 'is_friendly': 1}])
+    assert client.get('/vessels/', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_listing_keeps_trajectory_unless_projected_away(client):
+    client.post('/vessels/bulk', json=[{'vessel_id': 'a', 'lat': 1.0, 'lon': 2.0, 'speed': 5.0, 'heading': 90.0}])
+    vessel, = client.get('/vessels/').json
+    assert vessel['trajectory'] is not None
+    assert client.get('/vessels/?fields=lat,lon').json == [{'vessel_id': 'a', 'lat': 1.0, 'lon': 2.0}]
+
+
+@pytest.mark.parametrize('query', ['bbox=1,2,3', 'bbox=a,b,c,d', 'bbox=1,2,3,nan', 'limit=-5', 'limit=0'])
+def test_bad_list_arguments_are_rejected(client, query):
+    assert client.get(f'/vessels/?{query}').status_code == 400
+
+
+def test_contacts_at_needs_a_bbox(client):
+    assert client.get('/vessels/at').status_code == 400
+    assert client.get('/vessels/at?bbox=0,0,1,1').status_code == 200
+
+
+def test_delete_invalidates_if_modified_since(client):
+    from app.extensions import db
+    from app.ingest import remove_vessel_from_db
+    from app.models import Vessel
+    client.post('/vessels/bulk', json=[{'vessel_id': 'a', 'lat': 1.0, 'lon': 2.0},
+                                       {'vessel_id': 'b', 'lat': 1.0, 'lon': 2.0}])
+    db.session.execute(db.update(Vessel).values(updated_at=1000.0))
+    db.session.commit()
+    last_modified = client.get('/vessels/').headers['Last-Modified']
+    assert client.get('/vessels/', headers={'If-Modified-Since': last_modified}).status_code == 304
+
+    remove_vessel_from_db('b')
+    response = client.get('/vessels/', headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 200 and [v['vessel_id'] for v in response.json] == ['a']
+
+
+@pytest.mark.parametrize('method', ['post', 'patch'])
+@pytest.mark.parametrize('body', [
+    [1, 2],
+    [{'vessel_id': 'a', 'lat': 'abc', 'lon': 2.0}],
+    [{'vessel_id': 'a', 'lat': 1.0, 'lon': 2.0, 'speed': True}],
+    [{'vessel_id': ['a'], 'lat': 1.0, 'lon': 2.0}],
+    [{'vessel_id': 'a', 'lat': None, 'lon': 2.0}],
+    [{'vessel_id': 'a', 'lat': 1.0, 'lon': None}],
+    [{'vessel_id': 'a', 'lat': 500, 'lon': 2.0}],
+    [{'vessel_id': 'a', 'lat': 1.0, 'lon': -9999}],
+    [{'vessel_id': 'a', 'lat': 1.0, 'lon': 2.0, 'speed': -3}],
+    [{'vessel_id': 'a', 'lat': 1.0, 'lon': 2.0, 'heading': 360}],
+    [{'vessel_id': 'a', 'lat': 1.0, 'lon': 2.0, 'is_friendly': 7.5}],
+    {'vessel_id': 'a'},
+])
+def test_malformed_bulk_records_are_rejected(client, method, body):
+    client.post('/vessels/bulk', json=[{'vessel_id': 'a', 'lat': 1.0, 'lon': 2.0}])
+    assert getattr(client, method)('/vessels/bulk', json=body).status_code == 400
+
+
+def test_bulk_post_needs_a_position(client):
+    assert client.post('/vessels/bulk', json=[{'vessel_id': 'a', 'lat': None, 'lon': 2.0}]).status_code == 400
+    assert client.post('/vessels/bulk', json=[{'vessel_id': 7, 'lat': 1.0, 'lon': 2.0, 'speed': None}]).status_code == 200
+    assert client.post('/vessels/bulk', json=[{'vessel_id': 8, 'lat': -90, 'lon': 180, 'speed': 0, 'heading': 359.9,
+                                               'is_friendly': 1}]).status_code == 200
+    assert client.get('/vessels/7').json['vessel_id'] == '7'
+
+
+def test_history_endpoints_return_null_not_nan(client):
+    client.post('/vessels/bulk', json=[{'vessel_id': 'a', 'lat': 1.0, 'lon': 2.0, 'speed': 5.0, 'timestamp': 10}])
+    client.post('/vessels/bulk', json=[{'vessel_id': 'a', 'lat': 1.1, 'lon': 2.0, 'timestamp': 20}])
+    client.post('/vessels/bulk', json=[{'vessel_id': 'b', 'lat': 1.2, 'lon': 2.0, 'speed': 3.0, 'timestamp': 20}])
+    for url in ('/vessels/a/track', '/vessels/at?bbox=0,1,2,3&t=30'):
+        text = client.get(url).get_data(as_text=True)
+        assert 'NaN' not in text
+        assert None in [row['speed'] for row in json.loads(text)]
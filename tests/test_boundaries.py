@@ -0,0 +1,71 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from app.boundaries import BoundaryRegistry
+from app.utils import check_boundary_crossing, generate_alerts, predict_trajectory_batch
+
+EEZ = [[0.0, 0.0], [0.0, 10.0], [10.0, 10.0], [10.0, 0.0]]
+STRAIT = [[20.0, 20.0], [20.0, 22.0], [22.0, 22.0], [22.0, 20.0]]
+
+
+@pytest.fixture
+def registry():
+    return BoundaryRegistry({'eez': EEZ, 'strait': STRAIT})
+
+
+TRACKS = [
+    [[5.0, -1.0], [5.0, 1.0]],     # enters eez
+    [[5.0, 5.0], [6.0, 6.0]],      # stays inside eez
+    [[21.0, 19.0], [21.0, 23.0]],  # crosses strait twice
+    [[-5.0, 5.0], [21.0, 21.0]],   # cuts through eez, ends in strait
+    [[50.0, 50.0], [51.0, 51.0]],  # far away
+]
+
+
+def test_crossings_matrix(registry):
+    expected = [[True, False], [False, False], [False, True], [True, True], [False, False]]
+    assert registry.crossings(TRACKS).tolist() == expected
+    assert registry.crossed_names(TRACKS) == [['eez'], [], ['strait'], ['eez', 'strait'], []]
+
+
+def test_crossings_match_single_track_checks(registry):
+    rng = np.random.default_rng(0)
+    tracks = rng.uniform(-5, 25, size=(200, 11, 2))
+    matrix = registry.crossings(tracks)
+    for i, track in enumerate(tracks):
+        assert matrix[i].tolist() == [registry.crosses(name, track) for name in registry.names]
+        assert matrix[i, 0] == check_boundary_crossing(track.tolist(), EEZ)
+
+
+def test_empty_inputs(registry):
+    assert registry.crossings(np.empty((0, 11, 2))).shape == (0, 2)
+    assert BoundaryRegistry().crossings(TRACKS).shape == (5, 0)
+
+
+def test_registration(registry, tmp_path):
+    with pytest.raises(ValueError):
+        registry.register('eez', EEZ)
+    path = tmp_path / 'boundaries.json'
+    path.write_text(json.dumps({'eez': EEZ}))
+    assert BoundaryRegistry.from_file(str(path)).crossed_names(TRACKS[:1]) == [['eez']]
+    assert BoundaryRegistry.from_file(None).names == []
+
+
+def test_generate_alerts(registry):
+    df = pd.DataFrame({'vessel_id': ['a', 'b', 'c', 'd', 'e']})
+    alerts = generate_alerts(df, TRACKS, registry)
+    assert [(a['vessel_id'], a['boundary']) for a in alerts] == [('a', 'eez'), ('c', 'strait'), ('d', 'eez'), ('d', 'strait')]
+    assert check_boundary_crossing([[0, 0]], 'not a polygon') is False
+
+
+def test_tracks_across_the_antimeridian_stay_local(registry):
+    # Wrapped, this track jumps from about 180 to about -180; it must not sweep across the eez
+    tracks = predict_trajectory_batch([5.0, 5.0], [179.97, -179.97], [20.0, 20.0], [90.0, 270.0], 60)
+    assert registry.crossed_names(tracks) == [[], []]
+    assert check_boundary_crossing(tracks[0].tolist(), EEZ) is False
+
+    dateline = BoundaryRegistry({'west': [[0.0, -179.95], [0.0, -179.0], [10.0, -179.0], [10.0, -179.95]],
+                                 'east': [[0.0, 179.0], [0.0, 179.85], [10.0, 179.85], [10.0, 179.0]]})
+    assert dateline.crossed_names(tracks) == [['west'], ['east']]
+    assert dateline.crosses('west', tracks[0]) and not dateline.crosses('east', tracks[0])
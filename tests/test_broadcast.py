@@ -0,0 +1,135 @@
+import pandas as pd
+import pytest
+from app.broadcast import DeltaBroadcaster
+
+METRE_DEG = 1 / 111195  # one metre of latitude
+
+
+@pytest.fixture
+def broadcaster():
+    broadcaster = DeltaBroadcaster(None, '/dashboard')
+    broadcaster.move_threshold_m = 10
+    return broadcaster
+
+
+def fleet(**overrides):
+    rows = {
+        'a': {'lat': 10.0, 'lon': 20.0, 'speed': 12.0, 'heading': 90.0, 'timestamp': 1.0, 'is_friendly': None},
+        'b': {'lat': 11.0, 'lon': 21.0, 'speed': None, 'heading': 359.5, 'timestamp': 1.0, 'is_friendly': True},
+    }
+    for vessel_id, values in overrides.items():
+        rows[vessel_id] = dict(rows.get(vessel_id, rows['a']), **values) if values is not None else None
+    return pd.DataFrame([dict(row, vessel_id=vessel_id) for vessel_id, row in rows.items() if row is not None])
+
+
+def ids(records):
+    return sorted(record['vessel_id'] for record in records)
+
+
+def test_first_diff_adds_everything(broadcaster):
+    delta, changed = broadcaster.diff(fleet())
+    assert ids(delta['added']) == ['a', 'b']
+    assert delta['updated'] == [] and delta['removed'] == []
+    assert sorted(changed['vessel_id']) == ['a', 'b']
+
+
+def test_unchanged_nulls_are_not_updates(broadcaster):
+    broadcaster.diff(fleet())
+    delta, changed = broadcaster.diff(fleet())
+    assert delta['updated'] == [] and changed.empty
+
+
+def test_null_transitions_are_updates(broadcaster):
+    broadcaster.diff(fleet())
+    delta, _ = broadcaster.diff(fleet(a={'is_friendly': False}, b={'speed': 4.0}))
+    assert ids(delta['updated']) == ['a', 'b']
+
+
+def test_position_null_transitions_are_updates(broadcaster):
+    broadcaster.diff(fleet())
+    delta, _ = broadcaster.diff(fleet(a={'lat': None}))
+    assert ids(delta['updated']) == ['a']
+    delta, _ = broadcaster.diff(fleet(a={'lat': None}))
+    assert delta['updated'] == []
+    delta, _ = broadcaster.diff(fleet())
+    assert ids(delta['updated']) == ['a']
+
+
+def test_heading_wraps_around_north(broadcaster):
+    broadcaster.diff(fleet())
+    delta, _ = broadcaster.diff(fleet(b={'heading': 0.2}))
+    assert delta['updated'] == []
+
+
+def test_small_moves_accumulate(broadcaster):
+    broadcaster.diff(fleet())
+    delta, _ = broadcaster.diff(fleet(a={'lat': 10.0 + 6 * METRE_DEG}))
+    assert delta['updated'] == []
+    delta, _ = broadcaster.diff(fleet(a={'lat': 10.0 + 12 * METRE_DEG}))
+    assert ids(delta['updated']) == ['a']
+
+
+def test_removed_and_sequence(broadcaster):
+    first, _ = broadcaster.diff(fleet())
+    delta, _ = broadcaster.diff(fleet(b=None))
+    assert delta['removed'] == ['b']
+    assert delta['seq'] == first['seq'] + 1
+
+
+class RecordingSocket:
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, payload, **kwargs):
+        self.emitted.append(payload)
+
+
+def test_quiet_ticks_still_run_hooks(broadcaster, monkeypatch):
+    broadcaster.socketio = RecordingSocket()
+    broadcaster.encoding = 'json'
+    monkeypatch.setattr(broadcaster, 'load', fleet)
+    calls = []
+    broadcaster.on_delta(lambda delta, changed: calls.append(len(changed)))
+    assert broadcaster.tick() is not None
+    assert broadcaster.tick() is None
+    assert calls == [2, 0]
+    assert len(broadcaster.socketio.emitted) == 1
+
+    broadcaster.on_delta(lambda delta, changed: delta.update(alerts=[{'state': 'cleared'}]))
+    assert broadcaster.tick()['alerts'] == [{'state': 'cleared'}]
+    assert len(broadcaster.socketio.emitted) == 2
+
+
+def test_failed_tick_is_sent_again(broadcaster, monkeypatch):
+    broadcaster.socketio = RecordingSocket()
+    broadcaster.encoding = 'json'
+    monkeypatch.setattr(broadcaster, 'load', fleet)
+    failures = [RuntimeError('hook failed')]
+
+    @broadcaster.on_delta
+    def flaky(delta, changed):
+        if failures:
+            raise failures.pop()
+
+    with pytest.raises(RuntimeError):
+        broadcaster.tick()
+    assert broadcaster.socketio.emitted == [] and broadcaster.state.empty
+    assert ids(broadcaster.tick()['added']) == ['a', 'b']
+
+
+def test_contact_without_speed_is_checked_where_it_sits(app, monkeypatch):
+    import warnings
+    from app.blueprints.dashboard import sockets
+    from app.boundaries import BoundaryRegistry
+    monkeypatch.setattr(app, 'boundaries', BoundaryRegistry({'eez': [[0.0, 0.0], [0.0, 10.0], [10.0, 10.0],
+                                                                      [10.0, 0.0]]}))
+    changed = pd.DataFrame([
+        {'vessel_id': 'drifter', 'lat': 5.0, 'lon': 0.0, 'speed': None, 'heading': 90.0},
+        {'vessel_id': 'no_course', 'lat': 5.0, 'lon': 10.0, 'speed': 12.0, 'heading': None},
+        {'vessel_id': 'no_fix', 'lat': None, 'lon': None, 'speed': 12.0, 'heading': 90.0},
+    ])
+    delta = {'removed': []}
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        sockets.attach_alerts(delta, changed)
+    assert sorted(alert['vessel_id'] for alert in delta['alerts']) == ['drifter', 'no_course']
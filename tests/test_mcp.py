@@ -0,0 +1,121 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+from app import mcp as mcp_module
+from app.mcp import MCP, estimate_tokens
+
+
+class StubMessages:
+    def __init__(self):
+        self.requests = []
+        self.barrier = None
+
+    def create(self, **request):
+        self.requests.append(request)
+        if self.barrier is not None:
+            self.barrier.wait(timeout=5)
+        prompt = request['messages'][-1]['content']
+        if prompt == 'fail':
+            raise RuntimeError('api down')
+        reply = 'summary' if prompt.startswith('Previous summary') else f're: {prompt}'
+        return SimpleNamespace(content=[{'type': 'text', 'text': reply}])
+
+
+@pytest.fixture
+def make_mcp():
+    def make(**kwargs):
+        client = MCP('test-key', **kwargs)
+        client.client = SimpleNamespace(messages=StubMessages())
+        return client
+    return make
+
+
+def roles(request):
+    return [message['role'] for message in request['messages']]
+
+
+def test_oldest_pairs_are_dropped_to_fit_the_budget(make_mcp):
+    client = make_mcp(max_context_tokens=30)
+    for word in ('one', 'two', 'three'):
+        client.send_message_with_context('s', word * 8)  # 7-12 tokens per message
+    first, second, third = client.client.messages.requests
+    assert roles(first) == ['user']
+    assert roles(second) == ['user', 'assistant', 'user']
+    assert roles(third) == ['user', 'assistant', 'user']
+    assert third['messages'][0]['content'] == 'two' * 8
+    assert 'system' not in third
+
+
+def test_newest_turn_is_kept_even_over_budget(make_mcp):
+    client = make_mcp(max_context_tokens=1)
+    client.send_message_with_context('s', 'x' * 100)
+    request, = client.client.messages.requests
+    assert request['messages'] == [{'role': 'user', 'content': 'x' * 100}]
+
+
+def test_dropped_turns_fold_into_a_rolling_summary(make_mcp):
+    client = make_mcp(max_context_tokens=30, summarize=True)
+    for word in ('one', 'two', 'three'):
+        client.send_message_with_context('s', word * 8)
+    requests = client.client.messages.requests
+    summary_call = requests[2]
+    assert 'one' * 8 in summary_call['messages'][0]['content']
+    assert 'two' * 8 not in summary_call['messages'][0]['content']
+    assert summary_call['max_tokens'] == 300
+    assert requests[3]['system'].endswith('summary')
+    assert client.context_cache['s'].summary == 'summary'
+
+
+def test_least_recently_used_session_is_evicted(make_mcp):
+    client = make_mcp(max_sessions=2)
+    for session_id in ('a', 'b', 'a', 'c'):
+        client.send_message_with_context(session_id, 'hi')
+    assert list(client.context_cache) == ['a', 'c']
+
+
+def test_idle_sessions_are_evicted(make_mcp, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(mcp_module.time, 'monotonic', lambda: clock[0])
+    client = make_mcp(idle_seconds=60)
+    client.send_message_with_context('old', 'hi')
+    clock[0] += 30
+    client.send_message_with_context('recent', 'hi')
+    clock[0] += 45
+    client.send_message_with_context('new', 'hi')
+    assert list(client.context_cache) == ['recent', 'new']
+
+
+def test_response_cache_is_opt_in(make_mcp):
+    client = make_mcp(response_cache_ttl=60)
+    assert client.send_message_with_context('a', 'status?', cache=True) == [{'type': 'text', 'text': 're: status?'}]
+    assert client.send_message_with_context('b', 'status?', cache=True) == [{'type': 'text', 'text': 're: status?'}]
+    client.send_message_with_context('c', 'status?')
+    assert len(client.client.messages.requests) == 2
+    assert roles({'messages': client.context_cache['b'].messages}) == ['user', 'assistant']
+
+    uncached = make_mcp()
+    uncached.send_message_with_context('a', 'status?', cache=True)
+    uncached.send_message_with_context('b', 'status?', cache=True)
+    assert len(uncached.client.messages.requests) == 2
+
+
+def test_failed_call_leaves_no_dangling_user_turn(make_mcp):
+    client = make_mcp()
+    with pytest.raises(RuntimeError):
+        client.send_message_with_context('s', 'fail')
+    assert client.context_cache['s'].messages == []
+
+
+def test_send_many_runs_sessions_concurrently(make_mcp):
+    client = make_mcp(max_workers=3)
+    # Every call waits for the other two, so this only finishes if all three are in flight at once
+    client.client.messages.barrier = threading.Barrier(3)
+    replies = client.send_many([(session_id, f'to {session_id}', {}) for session_id in ('a', 'b', 'c')])
+    assert [client.text(reply) for reply in replies] == ['re: to a', 're: to b', 're: to c']
+    assert sorted(client.context_cache) == ['a', 'b', 'c']
+
+
+def test_token_estimate_counts_text_blocks():
+    assert estimate_tokens('abcdefgh') == 3
+    assert estimate_tokens([{'type': 'text', 'text': 'abcdefgh'}, SimpleNamespace(text='abcd')]) == 5
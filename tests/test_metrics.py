@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip('prometheus_client')
+from prometheus_client import REGISTRY
+
+from app.metrics import instrument, timed
+
+
+@pytest.fixture(autouse=True)
+def single_process(monkeypatch):
+    monkeypatch.delenv('PROMETHEUS_MULTIPROC_DIR', raising=False)
+
+
+def observations(stage):
+    return REGISTRY.get_sample_value('msa_stage_seconds_count', {'stage': stage}) or 0
+
+
+def test_timed_records_even_when_the_stage_fails():
+    before = observations('test_timed')
+    with timed('test_timed'):
+        pass
+    with pytest.raises(ValueError):
+        with timed('test_timed'):
+            raise ValueError
+    assert observations('test_timed') == before + 2
+
+
+def test_instrument_wraps_the_function():
+    @instrument('test_instrument')
+    def detect(x):
+        """Detect things."""
+        return x * 2
+
+    before = observations('test_instrument')
+    assert detect(21) == 42
+    assert detect.__name__ == 'detect' and detect.__doc__ == 'Detect things.'
+    assert observations('test_instrument') == before + 1
+
+
+def test_metrics_endpoint(client):
+    with timed('test_endpoint'):
+        pass
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    body = response.get_data(as_text=True)
+    assert '# TYPE msa_stage_seconds histogram' in body
+    assert 'msa_stage_seconds_count{stage="test_endpoint"} 1.0' in body
+    assert 'msa_stage_seconds_bucket{le="0.001",stage="test_endpoint"}' in body
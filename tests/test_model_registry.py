@@ -0,0 +1,95 @@
+import gc
+import threading
+import time
+
+import pytest
+
+from app.model_registry import ModelRegistry
+
+
+class CountingLoader:
+    def __init__(self, delay=0):
+        self.calls = 0
+        self.delay = delay
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return object()
+
+
+@pytest.fixture
+def registry():
+    registry = ModelRegistry()
+    registry.register('embeddings', CountingLoader())
+    registry.register('ocr_reader', CountingLoader())
+    yield registry
+    gc.unfreeze()
+
+
+def test_nothing_loads_until_first_get(registry):
+    assert registry._loaders['embeddings'].calls == 0
+    assert not registry.is_loaded('embeddings')
+    model = registry.get('embeddings')
+    assert registry.is_loaded('embeddings')
+    assert registry.get('embeddings') is model
+    assert registry._loaders['embeddings'].calls == 1
+    assert registry._loaders['ocr_reader'].calls == 0
+
+
+def test_concurrent_gets_load_once():
+    registry = ModelRegistry()
+    loader = CountingLoader(delay=0.05)
+    registry.register('vectorstore', loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get('vectorstore'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loader.calls == 1
+    assert len({id(model) for model in results}) == 1
+
+
+def test_stats(registry):
+    stats = registry.stats()
+    assert stats == {'embeddings': {'loaded': False}, 'ocr_reader': {'loaded': False}}
+    registry.get('ocr_reader')
+    stats = registry.stats()
+    assert stats['embeddings'] == {'loaded': False}
+    assert stats['ocr_reader']['loaded']
+    assert stats['ocr_reader']['load_seconds'] >= 0
+    assert isinstance(stats['ocr_reader']['rss_delta_bytes'], int)
+
+
+def test_unload_rebuilds_on_next_get(registry):
+    first = registry.get('embeddings')
+    registry.unload('embeddings')
+    assert not registry.is_loaded('embeddings')
+    assert registry.stats()['embeddings']['loaded'] is False
+    assert registry.get('embeddings') is not first
+    assert registry._loaders['embeddings'].calls == 2
+
+
+def test_preload(registry):
+    registry.preload(['ocr_reader'])
+    assert registry.is_loaded('ocr_reader')
+    assert not registry.is_loaded('embeddings')
+    registry.preload()
+    assert registry.is_loaded('embeddings')
+    assert registry._loaders['ocr_reader'].calls == 1
+
+
+def test_unknown_model_raises(registry):
+    with pytest.raises(KeyError):
+        registry.get('missing')
+
+
+def test_models_endpoint(client, monkeypatch):
+    from app import utils
+    registry = ModelRegistry()
+    registry.register('embeddings', CountingLoader())
+    monkeypatch.setattr(utils, 'models', registry)
+    response = client.get('/system/models')
+    assert response.status_code == 200
+    assert response.get_json() == {'embeddings': {'loaded': False}}
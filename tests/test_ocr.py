@@ -0,0 +1,42 @@
+import pytest
+from app import ocr
+from app.ocr import OCRService
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_ocr(image_bytes, max_side, large_image):
+        calls.append(image_bytes)
+        if image_bytes == b'corrupt':
+            raise ValueError('Unreadable image')
+        return image_bytes.decode().upper()
+
+    monkeypatch.setattr(ocr, '_ocr_bytes', fake_ocr)
+    service = OCRService(workers=0, cache_dir=str(tmp_path / 'cache'))
+    service.calls = calls
+    return service
+
+
+def test_one_bad_image_does_not_fail_the_batch(service, tmp_path):
+    texts, errors = service.read_batch_with_errors([b'deck', b'corrupt', str(tmp_path / 'missing.png')])
+    assert texts == ['DECK', None, None]
+    assert errors[0] is None and 'Unreadable' in errors[1] and 'FileNotFoundError' in errors[2]
+    assert service.read_batch([b'deck', b'corrupt']) == ['DECK', '']
+
+
+def test_results_are_cached_by_content(service, tmp_path):
+    path = tmp_path / 'hull.png'
+    path.write_bytes(b'hull')
+    assert service.read_batch([str(path), b'hull', b'hull']) == ['HULL'] * 3
+    assert service.calls == [b'hull']
+    fresh = OCRService(workers=0, cache_dir=service.cache_dir)
+    assert fresh.read_batch([b'hull']) == ['HULL']  # from the disk cache
+    assert service.calls == [b'hull']
+
+
+def test_failures_are_not_cached(service):
+    service.read_batch([b'corrupt'])
+    service.read_batch([b'corrupt'])
+    assert service.calls == [b'corrupt', b'corrupt']
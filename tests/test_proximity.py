@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.proximity import ProximityEngine
+
+
+def frame(*rows):
+    return pd.DataFrame(rows, columns=['vessel_id', 'lat', 'lon', 'speed', 'heading'])
+
+
+@pytest.fixture
+def engine():
+    return ProximityEngine(cpa_threshold_nm=1.0, horizon_minutes=30, max_speed_kn=30.0)
+
+
+def test_head_on_pair_meets_at_the_midpoint(engine):
+    # 10 nm apart on the equator, closing at 20 kn: CPA 0 after 30 minutes
+    pairs = engine.assess_frame(frame(('a', 0.0, 0.0, 10.0, 90.0), ('b', 0.0, 10 / 60, 10.0, 270.0)))
+    pair, = pairs.itertuples(index=False)
+    assert pair.range_nm == pytest.approx(10.0, rel=1e-3)
+    assert pair.cpa_nm == pytest.approx(0.0, abs=1e-6)
+    assert pair.tcpa_min == pytest.approx(30.0, rel=1e-3)
+
+
+def test_crossing_pair_misses_by_offset(engine):
+    # b crosses a's stationary position 0.5 nm north of it
+    pairs = engine.assess_frame(frame(('a', 0.0, 0.0, 0.0, 0.0), ('b', 0.5 / 60, -5 / 60, 10.0, 90.0)))
+    assert pairs['cpa_nm'].iloc[0] == pytest.approx(0.5, rel=1e-3)
+    assert pairs['tcpa_min'].iloc[0] == pytest.approx(30.0, rel=1e-3)
+
+
+def test_diverging_and_beyond_horizon_pairs_are_dropped(engine):
+    opening = frame(('a', 0.0, 0.0, 10.0, 270.0), ('b', 0.0, 2 / 60, 10.0, 90.0))
+    too_late = frame(('a', 0.0, 0.0, 5.0, 90.0), ('b', 0.0, 40 / 60, 5.0, 270.0))
+    assert engine.assess_frame(opening).empty
+    assert engine.assess_frame(too_late).empty
+
+
+def test_pairs_across_the_antimeridian(engine):
+    pairs = engine.assess_frame(frame(('a', 0.0, 179.99, 0.0, 0.0), ('b', 0.0, -179.995, 0.0, 0.0)))
+    assert pairs['range_nm'].iloc[0] == pytest.approx(0.9, rel=1e-2)
+
+
+def test_unknown_course_is_stationary(engine):
+    # b is 2 nm south of a stationary a; a NaN heading must not turn its speed into a northbound closing course
+    pairs = engine.assess_frame(frame(('a', 0.0, 0.0, 0.0, 0.0), ('b', -2 / 60, 0.0, 10.0, np.nan)))
+    assert pairs.empty
+    pairs = engine.assess_frame(frame(('a', 0.0, 0.0, 10.0, 0.0), ('b', 2 / 60, 0.0, np.nan, 180.0)))
+    assert pairs['tcpa_min'].iloc[0] == pytest.approx(12.0, rel=1e-3)  # only a closes, at 10 kn
+
+
+def test_single_contact_is_assessed_against_the_fleet(engine):
+    fleet = frame(('a', 0.0, 0.0, 0.0, 0.0), ('far', 40.0, 40.0, 0.0, 0.0), ('new', 5.0, 5.0, 0.0, 0.0))
+    batch = frame(('new', 0.0, 0.5 / 60, 0.0, 0.0))
+    pairs = engine.assess_against(batch, fleet)
+    assert engine.min_cpa_per_vessel(pairs, batch['vessel_id']).tolist() == pytest.approx([0.5], rel=1e-3)
+    assert np.isnan(engine.min_cpa_per_vessel(engine.assess_frame(batch), batch['vessel_id']).iloc[0])
+
+
+def test_detect_anomalies_scores_single_contact_against_stored_fleet(app):
+    from app.ingest import bulk_upsert_vessels
+    from app.utils import detect_anomalies
+    bulk_upsert_vessels([{'vessel_id': 'moored', 'lat': 0.0, 'lon': 0.0, 'speed': 0.0, 'heading': 0.0,
+                          'timestamp': 1.0}], trajectory_minutes=None)
+    scored = detect_anomalies(frame(('new', 0.0, 0.3 / 60, 0.0, 0.0)).assign(timestamp=2.0))
+    assert scored['min_cpa_nm'].iloc[0] == pytest.approx(0.3, rel=1e-2)
+    assert scored['risk_proximity'].iloc[0] > 0
+
+
+def test_dashboard_tick_skips_vessels_without_a_position(app, monkeypatch):
+    from app.blueprints.dashboard import sockets
+    from app.broadcast import COLUMNS
+    from app.ingest import bulk_upsert_vessels
+    from app.tracks import TrackStore
+    bulk_upsert_vessels([{'vessel_id': 'a', 'lat': 0.0, 'lon': 0.0, 'speed': 0.0, 'heading': 0.0, 'timestamp': 1.0},
+                         {'vessel_id': 'b', 'lat': 0.0, 'lon': 0.3 / 60, 'speed': 0.0, 'heading': 0.0,
+                          'timestamp': 1.0},
+                         {'vessel_id': 'lost', 'lat': None, 'lon': None, 'speed': None, 'heading': None,
+                          'timestamp': 1.0}], trajectory_minutes=None)
+    broadcaster, track_store = sockets.broadcaster, TrackStore()
+    monkeypatch.setattr(sockets, 'track_store', track_store)
+    monkeypatch.setattr(broadcaster, '_state', pd.DataFrame(columns=COLUMNS).set_index('vessel_id'))
+    monkeypatch.setattr(broadcaster.socketio, 'emit', lambda *args, **kwargs: None)
+    delta = broadcaster.tick()  # a restart: every stored vessel is new, one of them without a position
+    assert sorted(record['vessel_id'] for record in delta['added']) == ['a', 'b', 'lost']
+    assert [(alert['vessel_id'], alert['other_vessel_id']) for alert in delta['alerts']] == [('a', 'b')]
+    assert len(track_store.query_range(0.0, 0.0, 5.0)) == 2
@@ -0,0 +1,51 @@
+import itertools
+from app.model_registry import ModelRegistry
+from app.rag import VERSION_KEY, RAGService
+from conftest import FakeRedis
+
+
+class FakeChain:
+    def __init__(self, store):
+        self.store = store
+
+    def invoke(self, inputs):
+        return {'result': f"{inputs['query']} from index {self.store}"}
+
+
+class ChainlessRAG(RAGService):
+    def _qa_chain(self):
+        if self._chain is None:
+            self._chain = FakeChain(self.vectorstore)
+        return self._chain
+
+
+def service(shared):
+    opened = itertools.count(1)
+    models = ModelRegistry()
+    models.register('vectorstore', lambda: next(opened))
+    return ChainlessRAG(models, api_key=None, redis_client=lambda: shared)
+
+
+def test_answers_are_cached_until_another_process_ingests():
+    shared = FakeRedis()
+    web = service(shared)
+    assert web.query('Port calls') == 'Port calls from index 1'
+    assert web.query('  port   CALLS ') == 'Port calls from index 1'
+
+    shared.incr(VERSION_KEY)  # a worker added chunks
+    assert web.query('port calls') == 'port calls from index 2'
+    assert web.query('Port calls') == 'port calls from index 2'
+
+
+def test_without_redis_the_local_cache_still_works():
+    rag = service(None)
+    assert rag.query('q') == rag.query('q') == 'q from index 1'
+
+
+def test_own_ingest_does_not_reopen_the_index():
+    shared = FakeRedis()
+    worker = service(shared)
+    worker.query('q')
+    worker._bump_version()  # what ingest does after adding chunks
+    assert worker.query('q') == 'q from index 1'
+    assert worker.models.is_loaded('vectorstore')
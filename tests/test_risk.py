@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.config import Config
+from app.risk import RiskEngine
+from app.utils import calculate_risk_score
+
+
+def legacy_risk_score(row, speed_threshold=12, anomaly_weight=30):
+    # The row-wise scorer RiskEngine replaced, kept verbatim as the reference
+    score = 0
+    if row['speed'] > speed_threshold:
+        score += 40
+    if (10 <= row['lat'] <= 15 and 43 <= row['lon'] <= 53) or \
+       (0 <= row['lat'] <= 5 and 65 <= row['lon'] <= 70) or \
+       (0 <= row['lat'] <= 5 and 97 <= row['lon'] <= 102):
+        score += 30
+    if row.get('anomaly', 1) == -1:
+        score += anomaly_weight
+    return min(score, 100)
+
+
+def fleet(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'lat': rng.uniform(-5, 20, n),
+        'lon': rng.uniform(40, 105, n),
+        'speed': rng.uniform(0, 25, n),
+        'anomaly': rng.choice([-1, 1], n),
+    })
+    # Zone corners and edges, where inclusive bounds matter
+    edges = pd.DataFrame({
+        'lat': [10, 15, 0, 5, 0, 12.5, 9.999],
+        'lon': [43, 53, 65, 70, 102, 43, 50],
+        'speed': [12, 12.01, 0, 30, 5, 12, 13],
+        'anomaly': [1, -1, -1, 1, -1, 1, -1],
+    })
+    return pd.concat([df, edges], ignore_index=True)
+
+
+def test_score_frame_matches_legacy_scorer():
+    df = fleet()
+    engine = RiskEngine(Config.RISK_ZONES)
+    expected = df.apply(legacy_risk_score, axis=1).to_numpy()
+    np.testing.assert_array_equal(engine.score_frame(df)['risk_score'].to_numpy(), expected)
+
+
+@pytest.mark.parametrize('speed_threshold, anomaly_weight', [(12, 30), (8, 50), (20, 80)])
+def test_row_wrapper_matches_legacy_scorer(app, speed_threshold, anomaly_weight):
+    df = fleet(100, seed=1)
+    for _, row in df.iterrows():
+        assert calculate_risk_score(row, speed_threshold, anomaly_weight) == \
+            legacy_risk_score(row, speed_threshold, anomaly_weight)
+
+
+def test_row_wrapper_reuses_one_engine_per_setting(app):
+    from app.utils import _risk_engine, risk_engine
+    assert _risk_engine(12, 30) is risk_engine
+    assert _risk_engine(8, 50) is _risk_engine(8, 50)
+
+
+def test_engines_follow_the_app_config(app, tmp_path):
+    from app import create_app
+    from app.utils import _risk_engine, anomaly_model, proximity_engine
+
+    zone = {'name': 'test', 'lat_min': 30, 'lat_max': 31, 'lon_min': 0, 'lon_max': 1, 'weight': 70}
+    overrides = dict(app.config, RISK_ZONES=[zone], PROXIMITY_CPA_NM=0.5, ANOMALY_MODEL_DIR=str(tmp_path / 'other'))
+    create_app(type('OverrideConfig', (), overrides))
+    assert anomaly_model.model_dir == str(tmp_path / 'other')
+    assert proximity_engine.cpa_threshold_nm == 0.5
+    row = {'lat': 30.5, 'lon': 0.5, 'speed': 0.0}
+    assert calculate_risk_score(row) == 70
+    assert _risk_engine(8, 50).zones == [zone]
+
+
+def test_missing_anomaly_column_scores_as_normal():
+    df = fleet(50, seed=2).drop(columns='anomaly')
+    engine = RiskEngine(Config.RISK_ZONES)
+    expected = df.apply(legacy_risk_score, axis=1).to_numpy()
+    np.testing.assert_array_equal(engine.score_frame(df)['risk_score'].to_numpy(), expected)
+
+
+def test_factor_contributions():
+    engine = RiskEngine(Config.RISK_ZONES, cpa_threshold_nm=1.0)
+    df = pd.DataFrame({
+        'lat': [12.0, 30.0, 12.0, 30.0],
+        'lon': [45.0, 0.0, 45.0, 0.0],
+        'speed': [20.0, 5.0, np.nan, 5.0],
+        'anomaly': [-1, 1, -1, 1],
+        'min_cpa_nm': [0.0, 0.5, np.nan, 2.0],
+    })
+    result = engine.score_frame(df)
+    assert list(result.columns) == RiskEngine.FACTORS + ['risk_score']
+    assert result.index.equals(df.index)
+    np.testing.assert_array_equal(result['risk_speed'], [40, 0, 0, 0])
+    np.testing.assert_array_equal(result['risk_zone'], [30, 0, 30, 0])
+    np.testing.assert_array_equal(result['risk_anomaly'], [30, 0, 30, 0])
+    np.testing.assert_allclose(result['risk_proximity'], [30, 15, 0, 0])
+    np.testing.assert_allclose(result['risk_score'], [100, 15, 60, 0])  # first row capped at 100
+
+
+def test_overlapping_zones_take_highest_weight():
+    zones = [
+        {'name': 'outer', 'lat_min': 0, 'lat_max': 10, 'lon_min': 0, 'lon_max': 10, 'weight': 20},
+        {'name': 'inner', 'lat_min': 4, 'lat_max': 6, 'lon_min': 4, 'lon_max': 6, 'weight': 50},
+    ]
+    engine = RiskEngine(zones)
+    np.testing.assert_array_equal(engine.zone_weights([5, 1, 20], [5, 1, 20]), [50, 20, 0])
+    np.testing.assert_array_equal(RiskEngine([]).zone_weights([5], [5]), [0])
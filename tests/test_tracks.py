@@ -0,0 +1,99 @@
+import pytest
+from app.tracks import TrackStore
+
+
+@pytest.fixture
+def store():
+    store = TrackStore(cell_deg=1.0)
+    store.upsert_many([
+        {'vessel_id': 'east', 'lat': 10.0, 'lon': 179.95},
+        {'vessel_id': 'west', 'lat': 10.0, 'lon': -179.95},
+        {'vessel_id': 'north', 'lat': 89.9, 'lon': 45.0},
+        {'vessel_id': 'home', 'lat': 51.0, 'lon': 1.0},
+    ])
+    return store
+
+
+def ids(tracks):
+    return sorted(track['vessel_id'] for track in tracks)
+
+
+def test_bbox_finds_contacts_in_range(store):
+    assert ids(store.query_bbox(50.0, 0.0, 52.0, 2.0)) == ['home']
+
+
+def test_bbox_across_the_antimeridian(store):
+    assert ids(store.query_bbox(9.0, 179.0, 11.0, -179.0)) == ['east', 'west']
+    assert ids(store.query_bbox(9.0, 179.0, 11.0, 181.0)) == ['east', 'west']
+    assert ids(store.query_bbox(9.0, -181.0, 11.0, -179.0)) == ['east', 'west']
+
+
+def test_range_across_the_antimeridian(store):
+    found = store.query_range(10.0, 179.95, 10.0)
+    assert ids(found) == ['east', 'west']
+    west = next(track for track in found if track['vessel_id'] == 'west')
+    assert west['range_nm'] == pytest.approx(0.1 * 60 * 0.9848, rel=2e-3)
+    assert west['bearing'] == pytest.approx(90.0, abs=0.1)
+
+
+def test_oversized_boxes_are_clamped(store):
+    assert ids(store.query_bbox(-1e6, -1e6, 1e6, 1e6)) == ['east', 'home', 'north', 'west']
+    assert ids(store.query_bbox(-90.0, -180.0, 90.0, 180.0)) == ['east', 'home', 'north', 'west']
+
+
+def test_range_over_the_pole(store):
+    assert ids(store.query_range(89.95, -135.0, 10.0)) == ['north']
+
+
+def test_moves_and_removals_update_the_grid(store):
+    store.upsert('home', lat=-33.9, lon=18.4)
+    assert store.query_bbox(50.0, 0.0, 52.0, 2.0) == []
+    assert ids(store.query_bbox(-35.0, 18.0, -33.0, 19.0)) == ['home']
+    store.remove(['home', 'missing'])
+    assert store.get('home') is None
+    assert store.query_bbox(-35.0, 18.0, -33.0, 19.0) == []
+
+
+@pytest.mark.parametrize('data', [
+    {'lat': 'nan', 'lon': 0},
+    {'lat': 0, 'lon': float('inf')},
+    {'lat': 0, 'lon': 0, 'range_nm': -1},
+    {'lon': 0},
+    {'bbox': [0, 0, 1]},
+    {'bbox': [0, 0, 1, 'nan']},
+    {'bbox': 5},
+    'lat',
+])
+def test_malformed_viewports_are_rejected(app, data):
+    from app.blueprints.radar.sockets import _parse_viewport
+    assert _parse_viewport(data) is None
+
+
+def test_sweep_survives_a_failing_subscriber(app, store, monkeypatch):
+    from app.blueprints.radar import sockets
+    sent = []
+
+    def emit(event, payload, to, namespace):
+        if to == 'bad':
+            raise ValueError('boom')
+        sent.append(to)
+
+    def stop(interval):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(sockets, 'track_store', store)
+    monkeypatch.setattr(sockets, 'subscriptions', {'bad': {'bbox': (0, 0, 1, 1)}, 'good': {'bbox': (50, 0, 52, 2)}})
+    monkeypatch.setattr(sockets.socketio, 'emit', emit)
+    monkeypatch.setattr(sockets.socketio, 'sleep', stop)
+    with pytest.raises(KeyboardInterrupt):
+        sockets._sweep(app, 1)
+    assert sent == ['good']
+
+
+def test_contacts_can_gain_and_lose_a_position(store):
+    store.upsert('lost', lat=None, lon=None)
+    store.upsert('lost', lat=51.5, lon=1.5)
+    assert ids(store.query_bbox(50.0, 0.0, 52.0, 2.0)) == ['home', 'lost']
+    store.upsert('home', lat=None, lon=None)
+    assert ids(store.query_bbox(50.0, 0.0, 52.0, 2.0)) == ['lost']
+    assert store.get('home')['lat'] is None
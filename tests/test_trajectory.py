@@ -0,0 +1,58 @@
+import warnings
+import numpy as np
+import pytest
+from app.utils import predict_trajectory, predict_trajectory_batch
+
+NM_IN_DEG = 1.852 / 6371.0088 * 180 / np.pi
+
+
+def test_shape_and_start_point():
+    tracks = predict_trajectory_batch([10.0, -20.0], [30.0, 40.0], [12.0, 0.0], [45.0, 200.0], 30, steps=5)
+    assert tracks.shape == (2, 6, 2)
+    assert np.allclose(tracks[:, 0], [[10.0, 30.0], [-20.0, 40.0]])
+    assert np.allclose(tracks[1], [-20.0, 40.0])  # stationary vessel stays put
+
+
+def test_due_east_along_the_equator_steps_evenly():
+    track = np.array(predict_trajectory(0.0, 0.0, 60.0, 90.0, 60, steps=4))
+    assert np.allclose(track[:, 0], 0.0)
+    assert np.allclose(np.diff(track[:, 1]), 15 * NM_IN_DEG)
+
+
+def test_due_north_keeps_longitude():
+    track = np.array(predict_trajectory(50.0, 10.0, 30.0, 0.0, 120, steps=2))
+    assert np.allclose(track[:, 1], 10.0)
+    assert track[-1, 0] == pytest.approx(50.0 + 60 * NM_IN_DEG)
+
+
+def test_rhumb_line_holds_its_bearing():
+    # On a loxodrome, longitude change is tan(heading) times the Mercator latitude change
+    track = predict_trajectory_batch(40.0, -30.0, 20.0, 60.0, 600, steps=10)[0]
+    lat, lon = np.radians(track[:, 0]), np.radians(track[:, 1])
+    psi = np.log(np.tan(np.pi / 4 + lat / 2))
+    assert np.allclose(np.diff(lon), np.tan(np.radians(60.0)) * np.diff(psi))
+
+
+def test_longitudes_wrap_at_the_antimeridian():
+    track = np.array(predict_trajectory(0.0, 179.9, 20.0, 90.0, 60))
+    assert (track[:, 1] >= -180).all() and (track[:, 1] < 180).all()
+    assert track[-1, 1] == pytest.approx(179.9 + 20 * NM_IN_DEG - 360)
+    west = predict_trajectory_batch(0.0, -179.9, 20.0, 270.0, 60, method='great_circle')[0, -1]
+    assert west[1] == pytest.approx(-179.9 - 20 * NM_IN_DEG + 360)
+
+
+def test_great_circle_bends_poleward():
+    rhumb = predict_trajectory_batch(45.0, 0.0, 20.0, 90.0, 600)[0, -1]
+    great_circle = predict_trajectory_batch(45.0, 0.0, 20.0, 90.0, 600, method='great_circle')[0, -1]
+    assert rhumb[0] == pytest.approx(45.0)
+    assert great_circle[0] < 45.0  # an initial bearing of east drifts toward the equator
+    with pytest.raises(ValueError):
+        predict_trajectory_batch(0, 0, 1, 0, 10, method='bogus')
+
+
+def test_tracks_from_a_pole_stay_finite():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        tracks = predict_trajectory_batch([-90.0, 90.0], [180.0, 0.0], [0.0, 10.0], [0.0, 90.0], 30)
+    assert np.isfinite(tracks).all()
+    assert np.allclose(tracks[0], [-90.0, -180.0])
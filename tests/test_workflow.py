@@ -0,0 +1,99 @@
+import io
+import pytest
+from app import tasks
+from app.workflow import PENDING_KEY, SCHEDULED_KEY, drain_pending, enqueue_contact, get_job_status, set_job_status
+
+
+@pytest.fixture
+def image_dir(app, tmp_path):
+    app.config['WTF_CSRF_ENABLED'] = False  # dashboard forms post with a token from the page
+    app.config['CONTACT_IMAGE_DIR'] = str(tmp_path / 'contacts')
+    return tmp_path / 'contacts'
+
+
+def vessel(vessel_id):
+    return {'vessel_id': vessel_id, 'lat': 10.0, 'lon': 20.0, 'speed': 5.0, 'heading': 90.0, 'timestamp': 1.0}
+
+
+def add(client, vessel_id, **extra):
+    return client.post('/add_vessel', json=dict(vessel(vessel_id), time_minutes=30, is_friendly=0, **extra))
+
+
+def test_image_paths_from_clients_are_ignored(client, redis, image_dir):
+    assert add(client, 'a', image_id='../../etc/passwd').status_code == 400
+    assert add(client, 'a', image_id='0' * 32 + '.png').status_code == 400
+    response = add(client, 'a', image_path='/etc/passwd')
+    assert response.status_code == 202
+    item, = drain_pending(10)
+    assert 'image_path' not in item and item.get('image_id') is None
+
+
+def test_uploaded_images_are_referenced_by_id(client, redis, image_dir):
+    assert client.post('/contact_images', data={'image': (io.BytesIO(b'x'), 'notes.txt')}).status_code == 400
+    response = client.post('/contact_images', data={'image': (io.BytesIO(b'png bytes'), 'deck.PNG')})
+    assert response.status_code == 201
+    image_id = response.json['image_id']
+    assert (image_dir / image_id).read_bytes() == b'png bytes'
+    assert redis.scheduled == [{'ocr': [str(image_dir / image_id)]}]
+    assert add(client, 'a', image_id=image_id).status_code == 202
+    assert drain_pending(10)[0]['image_id'] == image_id
+
+
+def test_missing_image_fails_only_its_own_job(app, redis, image_dir, monkeypatch):
+    seen = []
+    monkeypatch.setattr(tasks, '_run_workflow', lambda items, paths: seen.append(([i['job_id'] for i in items], paths)))
+    image_dir.mkdir()
+    (image_dir / ('a' * 32 + '.png')).write_bytes(b'img')
+    good = enqueue_contact(vessel('a'), image_id='a' * 32 + '.png')
+    plain = enqueue_contact(vessel('b'))
+    gone = enqueue_contact(vessel('c'), image_id='b' * 32 + '.png')
+    tasks.run_workflow_batch()
+    assert seen == [([good, plain], [str(image_dir / ('a' * 32 + '.png'))])]
+    assert get_job_status(gone)['status'] == 'failed'
+    assert get_job_status(good)['status'] == 'queued'  # _run_workflow is stubbed
+    assert redis.llen(PENDING_KEY) == 0 and redis.get(SCHEDULED_KEY) is None
+
+
+def test_one_batch_is_scheduled_per_window(app, redis):
+    app.config['WORKFLOW_BATCH_WINDOW'] = 5.0
+    job_ids = [enqueue_contact(vessel(vessel_id)) for vessel_id in 'abc']
+    assert redis.scheduled == [{'countdown': 5.0}]
+    assert len(set(job_ids)) == 3
+    assert all(get_job_status(job_id)['status'] == 'queued' for job_id in job_ids)
+
+    assert [item['job_id'] for item in drain_pending(10)] == job_ids
+    enqueue_contact(vessel('d'))  # drained, so the window reopens
+    assert redis.scheduled == [{'countdown': 5.0}, {'countdown': 5.0}]
+
+
+def test_drain_takes_oldest_first_and_keeps_the_rest(app, redis):
+    job_ids = [enqueue_contact(vessel(str(i)), image_id=None) for i in range(5)]
+    first = drain_pending(2)
+    assert [item['job_id'] for item in first] == job_ids[:2]
+    assert first[0]['vessel'] == vessel('0') and first[0]['image_id'] is None
+    assert redis.get(SCHEDULED_KEY) is None
+    assert [item['job_id'] for item in drain_pending(10)] == job_ids[2:]
+    assert drain_pending(10) == []
+
+
+def test_leftovers_schedule_the_next_batch(app, redis, monkeypatch):
+    monkeypatch.setattr(tasks, '_run_workflow', lambda items, paths: None)
+    app.config['WORKFLOW_BATCH_MAX'] = 2
+    for vessel_id in 'abc':
+        enqueue_contact(vessel(vessel_id))
+    redis.scheduled.clear()
+    tasks.run_workflow_batch()
+    assert redis.llen(PENDING_KEY) == 1
+    assert redis.scheduled == [{'countdown': app.config['WORKFLOW_BATCH_WINDOW']}]
+
+
+def test_job_status_round_trip(client, redis):
+    assert get_job_status('nope') is None
+    assert client.get('/workflow_jobs/nope').status_code == 404
+    set_job_status('job1', 'done', incident_id=7, response_plan={'actions': ['shadow']})
+    job = get_job_status('job1')
+    assert job['status'] == 'done'
+    assert job['incident_id'] == 7
+    assert job['response_plan'] == {'actions': ['shadow']}
+    assert float(job['updated']) > 0
+    assert client.get('/workflow_jobs/job1').json == job